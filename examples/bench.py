@@ -1,36 +1,249 @@
-import time, json, random, sqlite3
-from lineagekit.cli import run as cli_run  # or just subprocess call to your CLI
-from lineagekit.store import export_json_from_db
-from pathlib import Path
-import subprocess, sys
+"""
+Benchmark suite on a synthetic pipeline.
+
+A pipeline of `--transforms` @transform steps over a `--rows` x `--width`
+source is generated as a module (so @transform source analysis runs for
+real); each dataset feeds `--fanout` transforms. The suite times the
+decorators, `_stats_for`, `persist_current_run`, `detect_changes`,
+`impact_bfs` and guard, JSON export and the UI's graph loading, each the best
+of `--repeat` runs on fresh DBs, and writes the results as JSON:
+
+    python examples/bench.py --out bench.json --baseline bench_base.json --save-baseline
+    python examples/bench.py --out bench.json --baseline bench_base.json --threshold 20
+
+With a baseline, metrics more than `--threshold` percent (and `--noise-floor`
+seconds) slower than it are reported and the script exits with status 1.
+"""
+import argparse, importlib.util, json, os, platform, random, shutil, sqlite3, sys, tempfile, time
+from typing import Callable, Dict, List
+
+from lineagekit import __version__
+from lineagekit.export import export_run
+from lineagekit.graph_cache import invalidate
+from lineagekit.impact import impact_bfs, impact_many, SEV_RANK
+from lineagekit.layout import cached_layout
+from lineagekit.lineage_tracker import run_scope, _stats_for
+from lineagekit.store import persist_current_run, detect_changes, snapshot_for
+from lineagekit.subgraph import find_nodes, neighborhood
+from lineagekit.ui.data import list_runs, run_summary, table_page, _summary
+
+# ---------------------------------------------------------------- pipeline generator
+
+_HEADER = '''\
+import numpy as np, pandas as pd
+from lineagekit import dataset, transform
+
+ROWS, WIDTH, SEED = {rows}, {width}, {seed}
+VARIANT = "A"  # "B" shifts, nulls and retypes a few source columns, so runs A -> B have changes
+
+@dataset(name="bench_src", io="read", fmt="synthetic")
+def load():
+    rng = np.random.default_rng(SEED)
+    df = pd.DataFrame(rng.random((ROWS, WIDTH)), columns=[f"c{{i}}" for i in range(WIDTH)])
+    if VARIANT == "B":
+        df["c0"] = df["c0"] * 3 + 1
+        df.loc[df.index[::4], "c1"] = np.nan
+        df["c2"] = (df["c2"] * 100).astype("int64")
+    return df
+
+@dataset(name="bench_sink", io="write", fmt="synthetic")
+def write(df, out_path):
+    pass
+'''
+
+_TRANSFORM = '''
+@transform(name="t{i}", produces="bench_t{i}")
+def t{i}(df):
+    return df.assign({assigns})
+'''
+
+_FOOTER = '''
+STEPS = [{steps}]
+
+def main():
+    frames = {{-1: load()}}
+    for i, (step, parent) in enumerate(STEPS):
+        frames[i] = step(frames[parent])
+    write(frames[len(STEPS) - 1], "bench://sink")
+'''
+
+def pipeline_source(transforms: int, width: int, rows: int, fanout: int, seed: int) -> str:
+    """Source of the synthetic pipeline module: a tree of transforms, `fanout` children per dataset."""
+    parts = [_HEADER.format(rows=rows, width=width, seed=seed)]
+    for i in range(transforms):
+        # every other column is derived from itself and its neighbour; the rest pass through
+        assigns = ", ".join(f'c{j}=df["c{j}"] + df["c{(j + 1 + i) % width}"]' for j in range(0, width, 2))
+        parts.append(_TRANSFORM.format(i=i, assigns=assigns))
+    steps = ", ".join(f"(t{i}, {i // fanout - 1})" for i in range(transforms))
+    parts.append(_FOOTER.format(steps=steps))
+    return "".join(parts)
+
+def load_pipeline(workdir: str, args):
+    path = os.path.join(workdir, "bench_pipeline.py")
+    with open(path, "w") as f:
+        f.write(pipeline_source(args.transforms, args.width, args.rows, args.fanout, args.seed))
+    spec = importlib.util.spec_from_file_location("bench_pipeline", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# ---------------------------------------------------------------- measurements
+
+def _timed(fn: Callable, *args, **kwargs) -> float:
+    t0 = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - t0
+
+def run_pipeline(pipeline, db: str, variant: str, capture: str, persist: bool, metrics: Dict[str, float]) -> str:
+    """One pipeline run in its own tracker; returns the run id."""
+    pipeline.VARIANT = variant
+    with run_scope() as t:
+        t.capture_level = capture
+        metrics[f"pipeline_{capture}_s"] = _timed(pipeline.main)
+        if capture == "full":
+            metrics["capture_overhead_s"] = sum(stats + ast + graph for _, _, _, _, stats, ast, graph in t.overhead.rows())
+            df = pipeline.load.__wrapped__()
+            with run_scope() as probe:  # a throwaway tracker: the probe's stats are never persisted
+                probe.capture_level = capture
+                metrics["stats_for_s"] = _timed(_stats_for, df, "bench_stats_probe")
+        if persist:
+            metrics["persist_s"] = _timed(persist_current_run, db)
+        return t.run_id
+
+def bench_once(pipeline, workdir: str, args) -> Dict[str, float]:
+    db = os.path.join(workdir, f"bench_{time.perf_counter_ns()}.db")
+    m: Dict[str, float] = {}
+    run_pipeline(pipeline, db, "A", "off", False, m)
+    run_pipeline(pipeline, db, "A", "structure", False, m)
+    base = run_pipeline(pipeline, db, "A", "full", True, m)
+    curr = run_pipeline(pipeline, db, "B", "full", True, m)
 
-def bench_run(script, db, label):
     t0 = time.perf_counter()
-    subprocess.check_call([sys.executable, "-m", "lineagekit.cli", "run", script, "--db", db])
-    t1 = time.perf_counter()
-    subprocess.check_call([sys.executable, "-m", "lineagekit.cli", "export", "--db", db, "--json", f"{label}.json"])
-    t2 = time.perf_counter()
-    return {"label": label, "run_s": t1-t0, "export_s": t2-t1}
-
-def bench_impact(db, run_id, starts, change="type_change"):
-    from lineagekit.impact import impact_bfs
+    changes = detect_changes(db, base, curr)
+    m["detect_changes_s"] = time.perf_counter() - t0
+
+    conn = sqlite3.connect(db)
+    cols = [r[0] for r in conn.execute("SELECT id FROM columns WHERE snapshot_id=? ORDER BY id",
+                                       (snapshot_for(conn, curr),))]
+    conn.close()
+    starts = random.Random(args.seed).sample(cols, min(args.impact_samples, len(cols)))
+    invalidate(db)  # include loading the run graph
+    m["impact_bfs_s"] = _timed(lambda: [impact_bfs(db, curr, c, "type_change", use_index=False) for c in starts])
+    invalidate(db)
     t0 = time.perf_counter()
-    n=0
-    for s in starts:
-        impact_bfs(db, run_id, s, change); n+=1
-    t1 = time.perf_counter()
-    return {"impact_avg_ms": (t1-t0)*1000/max(n,1), "samples": n}
+    # guard's work: changes, then the worst downstream severity of each
+    guarded = detect_changes(db, base, curr)
+    sevs = impact_many(db, curr, [(ch["node_id"], ch["change_type"]) for ch in guarded])
+    bad = [ch for ch in guarded if SEV_RANK.get(sevs[(ch["node_id"], ch["change_type"])], 0) >= SEV_RANK["HIGH"]]
+    m["guard_s"] = time.perf_counter() - t0
+
+    m["export_json_s"] = _timed(export_run, db, os.path.join(workdir, "bench_export.json"), curr)
+
+    def ui_load():
+        # what the Streamlit app reads on first render of a run
+        _summary.cache_clear()
+        run_id = list_runs(db)[0][0]
+        run_summary(db, run_id)
+        for level in ("dataset", "column"):
+            focus = find_nodes(db, run_id, "", level)[0][0]
+            nb = neighborhood(db, run_id, focus, level, depth=2)
+            cached_layout(db, list(nb.nodes), nb.edges, view=level)
+        for table in ("datasets", "columns", "transforms"):
+            table_page(db, run_id, table)
+    m["ui_load_s"] = _timed(ui_load)
+    m["changes_found"] = float(len(changes))
+    m["guard_blocking"] = float(len(bad))
+    return m
+
+def run_suite(args) -> Dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="lineagekit_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        pipeline = load_pipeline(workdir, args)
+        run_pipeline(pipeline, "", "A", "full", False, {})  # warm-up: imports, pandas and AST caches
+        runs = [bench_once(pipeline, workdir, args) for _ in range(args.repeat)]
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    metrics = {name: min(r[name] for r in runs) for name in runs[0]}
+    # what the decorators cost with capture reduced to the graph structure
+    metrics["decorator_overhead_s"] = max(metrics["pipeline_structure_s"] - metrics["pipeline_off_s"], 0.0)
+    return {
+        "params": {k: getattr(args, k) for k in ("transforms", "width", "rows", "fanout", "seed", "impact_samples")},
+        "repeat": args.repeat,
+        "lineagekit": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.time(),
+        "metrics": metrics,
+    }
+
+# ---------------------------------------------------------------- baseline comparison
+
+# informational metrics, not timings
+_NOT_TIMED = {"changes_found", "guard_blocking"}
+
+def compare(results: Dict, baseline: Dict, threshold_pct: float, noise_floor_s: float) -> List[Dict]:
+    """Per shared timing metric: baseline, current, change in percent and whether it regressed."""
+    rows = []
+    for name, base in baseline["metrics"].items():
+        curr = results["metrics"].get(name)
+        if curr is None or name in _NOT_TIMED:
+            continue
+        pct = (curr - base) / base * 100.0 if base > 0 else 0.0
+        rows.append({"metric": name, "baseline": base, "current": curr, "pct": pct,
+                     "regressed": pct > threshold_pct and curr - base > noise_floor_s})
+    return rows
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--transforms", type=int, default=20, help="Number of @transform steps")
+    p.add_argument("--width", type=int, default=40, help="Columns per dataset")
+    p.add_argument("--rows", type=int, default=20_000, help="Rows of the source frame")
+    p.add_argument("--fanout", type=int, default=2, help="Transforms reading each dataset (1 = a chain)")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--impact-samples", type=int, default=20, help="Origin columns for impact_bfs")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per metric; the best is kept")
+    p.add_argument("--out", default="bench_results.json", help="Where to write the results JSON")
+    p.add_argument("--baseline", default="", help="Results JSON to compare against")
+    p.add_argument("--save-baseline", action="store_true", help="Also write the results to --baseline")
+    p.add_argument("--threshold", type=float, default=20.0, help="Allowed slowdown per metric, in percent")
+    p.add_argument("--noise-floor", type=float, default=0.005, help="Slowdowns below this many seconds never fail")
+    p.add_argument("--workdir", default="", help="Keep generated pipeline and DBs here (default: a temp dir)")
+    args = p.parse_args(argv)
+    if args.transforms < 1 or args.width < 2 or args.rows < 1 or args.fanout < 1 or args.repeat < 1:
+        p.error("--transforms, --rows, --fanout and --repeat must be >= 1 and --width >= 2")
+
+    results = run_suite(args)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline {args.baseline}")
+    if not args.baseline or args.save_baseline:
+        for name, value in results["metrics"].items():
+            print(f"{name:24} {value:10.4f}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("params") != results["params"]:
+        print(f"Baseline params {baseline.get('params')} differ from {results['params']}; not comparable")
+        return 2
+    rows = compare(results, baseline, args.threshold, args.noise_floor)
+    print(f"{'metric':24} {'baseline':>10} {'current':>10} {'change':>8}")
+    for r in rows:
+        flag = "  REGRESSED" if r["regressed"] else ""
+        print(f"{r['metric']:24} {r['baseline']:10.4f} {r['current']:10.4f} {r['pct']:+7.1f}%{flag}")
+    regressed = [r["metric"] for r in rows if r["regressed"]]
+    if regressed:
+        print(f"{len(regressed)} metric(s) regressed by more than {args.threshold:g}%: {', '.join(regressed)}")
+        return 1
+    print("No regressions")
+    return 0
 
 if __name__ == "__main__":
-    db=""
-    # run A and B
-    subprocess.check_call(["env","LINEAGE_VARIANT=A",sys.executable,"-m","lineagekit.cli","run","test_runs.py","--db",db])
-    subprocess.check_call(["env","LINEAGE_VARIANT=B",sys.executable,"-m","lineagekit.cli","run","test_runs.py","--db",db])
-    # latest run id
-    conn=sqlite3.connect(db); cur=conn.cursor()
-    cur.execute("SELECT run_id FROM runs ORDER BY created_at DESC LIMIT 1"); run_id=cur.fetchone()[0]
-    cols=[r[0] for r in cur.execute("SELECT id FROM columns WHERE run_id=?",(run_id,))]
-    conn.close()
-    res1 = bench_run("test_runs.py", db, "bench")
-    res2 = bench_impact(db, run_id, random.sample(cols, min(20, len(cols))))
-    print(json.dumps({**res1, **res2}, indent=2))
\ No newline at end of file
+    sys.exit(main())
@@ -1,5 +1,6 @@
-import ast
-from typing import Dict, List, Set, Tuple
+import ast, hashlib, inspect, json, os
+from types import CodeType
+from typing import Dict, List, Optional, Set, Tuple
 
 # extract column names from df["cols"] or df.col
 def _extract_cols(node: ast.AST, df_names: Set[str]):
@@ -68,4 +69,80 @@ def analyze_transform_source(src: str, df_param_names: List[str] = ["df"]):
             self.generic_visit(n)
 
     V().visit(tree)
-    return rename, derives
\ No newline at end of file
+    return rename, derives
+
+# (code object, df param names) -> (rename_map, derives_map)
+_CACHE: Dict[Tuple[CodeType, Tuple[str, ...]], Tuple[Dict[str, str], Dict[str, List[str]]]] = {}
+
+# directory for the on-disk cache; LINEAGEKIT_AST_CACHE enables it across processes
+_cache_dir: Optional[str] = os.environ.get("LINEAGEKIT_AST_CACHE") or None
+
+def set_ast_cache_dir(path: Optional[str]):
+    global _cache_dir
+    _cache_dir = path or None
+
+def _disk_file(source_file: str):
+    return os.path.join(_cache_dir, hashlib.sha1(source_file.encode()).hexdigest()[:16] + ".json")
+
+def _disk_load(source_file: str, mtime_ns: int, key: str):
+    try:
+        with open(_disk_file(source_file)) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("mtime_ns") != mtime_ns or key not in data.get("entries", {}):
+        return None
+    rename, derives = data["entries"][key]
+    return rename, derives
+
+def _disk_store(source_file: str, mtime_ns: int, key: str, result):
+    path = _disk_file(source_file)
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("mtime_ns") != mtime_ns:
+            data = None
+    except (OSError, ValueError):
+        data = None
+    data = data or {"source_file": source_file, "mtime_ns": mtime_ns, "entries": {}}
+    data["entries"][key] = list(result)
+    try:
+        os.makedirs(_cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def analyze_function(func, df_param_names: List[str] = ["df"]):
+    """
+    Memoized `analyze_transform_source` for a function: parsed once per code
+    object, and once per (file, mtime) when the on-disk cache is enabled.
+    Functions without retrievable source yield empty maps.
+    """
+    code = getattr(func, "__code__", None)
+    mem_key = (code, tuple(df_param_names))
+    if code is not None and mem_key in _CACHE:
+        return _CACHE[mem_key]
+
+    source_file = code.co_filename if code is not None else None
+    disk_key = f"{getattr(func, '__qualname__', '')}:{code.co_firstlineno}:{','.join(df_param_names)}" if code else ""
+    mtime_ns = None
+    if _cache_dir and source_file and os.path.isfile(source_file):
+        mtime_ns = os.stat(source_file).st_mtime_ns
+        result = _disk_load(os.path.abspath(source_file), mtime_ns, disk_key)
+        if result is not None:
+            _CACHE[mem_key] = result
+            return result
+
+    try:
+        result = analyze_transform_source(inspect.getsource(func), df_param_names=df_param_names)
+    except Exception:
+        result = ({}, {})
+
+    if code is not None:
+        _CACHE[mem_key] = result
+    if mtime_ns is not None:
+        _disk_store(os.path.abspath(source_file), mtime_ns, disk_key, result)
+    return result
@@ -0,0 +1,234 @@
+"""
+Lineage for DataFrames that arrive in chunks (`pd.read_csv(..., chunksize=...)`,
+generators of frames). Chunks are profiled one at a time into mergeable
+per-column aggregates, so memory stays bounded by the chunk size.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import math, threading, types
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextFileReader
+
+from .lineage_tracker import (current_tracker, CaptureLevel, ColumnNode, ColumnStats, DatasetNode, ProfilePolicy, _col_id, _profile_numeric,
+                              _sample_rows, _sample_size, _confidence)
+from .overhead import charge, current_call
+
+# distinct values kept per non-numeric column; counts are exact until a column
+# has more distinct values than this, then the rarest are dropped on merge
+TOP_K = 64
+
+@dataclass
+class PartialStats:
+    """
+    Mergeable aggregates of one column: row/null counts, (n, mean, M2) moments
+    and top-k value counts. `merge` is associative, so chunks (or shards) can
+    be combined in any order.
+    """
+    dtype: str
+    rows: int = 0
+    nulls: int = 0
+    n: int = 0               # values behind the moments (non-null, sampled)
+    mean: float = 0.0
+    m2: float = 0.0          # sum of squared deviations from `mean`
+    numeric: bool = False
+    top: Counter = field(default_factory=Counter)
+
+    def merge(self, other: "PartialStats", top_k: int = TOP_K) -> "PartialStats":
+        self.dtype = _merge_dtype(self.dtype, other.dtype)
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.numeric = self.numeric or other.numeric
+        if other.n:
+            # Chan et al. pairwise update; stable where sum/sum-of-squares is not
+            n = self.n + other.n
+            delta = other.mean - self.mean
+            self.mean = self.mean + delta * other.n / n
+            self.m2 = self.m2 + other.m2 + delta * delta * self.n * other.n / n
+            self.n = n
+        if other.top:
+            self.top.update(other.top)
+            if len(self.top) > top_k:
+                self.top = Counter(dict(self.top.most_common(top_k)))
+        return self
+
+    def to_column_stats(self, dataset_id: str, column: str, run_id: str, sample_rows: int) -> ColumnStats:
+        # mirrors _profile: NaN moments for all-null columns, no std for a single row
+        mean = std = None
+        if self.numeric and self.rows:
+            mean = float(self.mean) if self.n else math.nan
+            if self.rows > 1:
+                std = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+        top, top_freq = self.top.most_common(1)[0] if self.top else (None, None)
+        return ColumnStats(dataset_id=dataset_id, column=column, dtype=self.dtype,
+                           count=self.rows, nulls=self.nulls, mean=mean, std=std,
+                           top=top, top_freq=top_freq, run_id=run_id,
+                           sample_rows=sample_rows, confidence=_confidence(sample_rows, self.rows))
+
+def _merge_dtype(a: str, b: str) -> str:
+    if a == b:
+        return a
+    try:
+        da, db = np.dtype(a), np.dtype(b)
+    except TypeError:
+        return "object"
+    if da.kind in "biufc" and db.kind in "biufc":
+        return str(np.result_type(da, db))
+    return "object"
+
+def chunk_partials(chunk: pd.DataFrame, policy: ProfilePolicy, top_k: int = TOP_K):
+    """(sampled rows, {column: PartialStats}) for one chunk."""
+    total = len(chunk)
+    n = _sample_size(chunk, policy)
+    frame = chunk if n >= total else _sample_rows(chunk, n, policy.seed)
+    scale = total / n if n else 1.0
+    kinds = [dt.kind for dt in frame.dtypes]
+    out: Dict[str, PartialStats] = {}
+
+    numeric = [i for i, k in enumerate(kinds) if k in "biuf"]
+    if numeric:
+        profiled: list = [None] * len(kinds)
+        _profile_numeric(frame, numeric, profiled)
+        for i in numeric:
+            col, dtype, nulls, mean, std, _, _ = profiled[i]
+            valid = n - nulls
+            out[col] = PartialStats(dtype=dtype, rows=total, nulls=int(round(nulls * scale)), numeric=True,
+                                    n=valid, mean=mean if valid else 0.0,
+                                    m2=std * std * (valid - 1) if valid > 1 else 0.0)
+    for i, k in enumerate(kinds):
+        if k in "biuf":
+            continue
+        s = frame.iloc[:, i]
+        nulls = int(s.isna().sum())
+        vc = s.value_counts(dropna=True).head(top_k)
+        out[frame.columns[i]] = PartialStats(dtype=str(s.dtype), rows=total, nulls=int(round(nulls * scale)),
+                                             top=Counter({str(v): int(round(c * scale)) for v, c in vc.items()}))
+    return n, out
+
+def is_chunk_iterator(obj) -> bool:
+    # generators, pandas chunked readers (read_csv/read_table chunksize=) and ChunkStream; other iterators
+    # (map, zip, csv.reader, iter(list)) keep going through the plain code path
+    return isinstance(obj, (types.GeneratorType, TextFileReader, ChunkStream))
+
+def replace_chunk_arg(args: tuple, kwargs: dict, wrap: Callable):
+    """Swap the first chunk-iterator argument for `wrap(it)`; returns (args, kwargs, wrapped or None)."""
+    for i, a in enumerate(args):
+        if is_chunk_iterator(a):
+            wrapped = wrap(a)
+            return args[:i] + (wrapped,) + args[i + 1:], kwargs, wrapped
+    for k, a in kwargs.items():
+        if is_chunk_iterator(a):
+            wrapped = wrap(a)
+            return args, {**kwargs, k: wrapped}, wrapped
+    return args, kwargs, None
+
+class ChunkStream:
+    """
+    Wraps an iterator of DataFrames without reading ahead. The dataset node
+    is registered from the first chunk (`register(chunk) -> DatasetNode`, or
+    None to only observe chunks of a dataset tracked upstream), each chunk
+    is tagged with the dataset id and folded into PartialStats,
+    and row count plus ColumnStats are recorded when the stream is exhausted
+    or closed. Streams left unfinished are recorded by `persist_current_run`
+    (`finish_streams()` on the owning tracker) with the rows read so far.
+    """
+
+    def __init__(self, chunks, register: Callable[[pd.DataFrame], Optional[DatasetNode]],
+                 profile: Optional[ProfilePolicy] = None, top_k: int = TOP_K):
+        self._source = chunks
+        self._it = iter(chunks)
+        self._register = register
+        # bound at creation: the stream may be consumed or finished from another context
+        self.owner = current_tracker()
+        self.policy = profile or self.owner.profiling
+        self.capture = self.owner.capture_level
+        # chunks read outside any decorated call charge their capture to the call that made the stream
+        self.cost = current_call()
+        self.top_k = top_k
+        self.run_id = self.owner.run_id
+        self.node: Optional[DatasetNode] = None
+        self.ds_id: Optional[str] = None
+        self.columns: List[str] = []
+        self.stats: Dict[str, PartialStats] = {}
+        self._dtypes: Dict[str, str] = {}
+        self.rows = 0
+        self.sampled = 0
+        self.finished = False
+        self._started = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> pd.DataFrame:
+        try:
+            chunk = next(self._it)
+        except StopIteration:
+            self.finish()
+            raise
+        if isinstance(chunk, pd.DataFrame):
+            if not self._started:
+                self._started = True
+                self.columns = list(chunk.columns)
+                self._dtypes = {c: str(chunk[c].dtype) for c in chunk.columns}
+                with charge("graph", self.cost):
+                    self.node = self._register(chunk)
+                if self.node is not None:
+                    self.owner.track_stream(self)
+                self.ds_id = self.node.id if self.node is not None else chunk.attrs.get("__ds_id__")
+            if self.node is not None:
+                chunk.attrs["__ds_id__"] = self.node.id
+                if not self.finished:
+                    with charge("stats", self.cost):
+                        self._fold(chunk)
+        return chunk
+
+    def _fold(self, chunk: pd.DataFrame):
+        if self.capture is not CaptureLevel.FULL:
+            # below full capture only the row count is kept
+            with self._lock:
+                self.rows += len(chunk)
+            return
+        sampled, parts = chunk_partials(chunk, self.policy, self.top_k)
+        with self._lock:
+            self.rows += len(chunk)
+            self.sampled += sampled
+            for col, p in parts.items():
+                if col in self.stats:
+                    self.stats[col].merge(p, self.top_k)
+                else:
+                    self.stats[col] = p
+
+    def finish(self):
+        """Record the row count and column stats seen so far (idempotent)."""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+        if self.node is None:
+            return
+        ds_id = self.node.id
+        self.node.rows = self.rows
+        self.owner.insert_dataset(self.node)
+        # chunks can widen a dtype (int64 -> float64 once NaNs show up)
+        widened = [ColumnNode(id=_col_id(ds_id, col), name=str(col), dataset_id=ds_id, dtype=p.dtype, run_id=self.run_id)
+                   for col, p in self.stats.items() if self._dtypes.get(col) != p.dtype]
+        if widened:
+            self.owner.insert_columns(widened)
+        self.owner.add_column_stats([p.to_column_stats(ds_id, col, self.run_id, self.sampled)
+                                  for col, p in self.stats.items()])
+        self.owner.untrack_stream(self)
+
+    def close(self):
+        self.finish()
+        close = getattr(self._source, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
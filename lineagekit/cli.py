@@ -1,15 +1,24 @@
 import sqlite3
+from typing import List
 
 from rich import print
+from rich.markup import escape
+from rich.table import Table
 from pathlib import Path
 import typer
 import runpy
 import subprocess
 from importlib.resources import files
 
-from .lineage_tracker import tracker
-from .impact import impact_bfs, SEV_RANK
-from .store import persist_current_run, export_json_from_db, detect_changes, latest_run_id
+from .lineage_tracker import tracker, ProfilePolicy
+from .ast_assist import set_ast_cache_dir
+from .impact import impact_bfs, impact_many, build_impact_index, SEV_RANK
+from .drift import detect_drift
+from .trace import trace as trace_column, trace_paths
+from .overhead import overhead_report
+from .export import export_run, import_ndjson
+from .columnar import export_parquet, import_parquet
+from .store import persist_current_run, export_json_from_db, detect_changes, latest_run_id, StreamingWriter, init_db, open_db, schema_version
 from .ui import streamlit_app_path
 
 app = typer.Typer(help="Lineage: run pipelines, persist lineage, and view the DAG")
@@ -17,16 +26,40 @@ app = typer.Typer(help="Lineage: run pipelines, persist lineage, and view the DA
 @app.command()
 def run(script: str = typer.Argument(..., help="Path to your pipeline script"),
         db: str = typer.Option("lineage.db", "--db", help="SQLite DB path"),
-        json_out: str = typer.Option("", "--json", help="Optional: export run to JSON file after")):
+        json_out: str = typer.Option("", "--json", help="Optional: export run to JSON file after"),
+        profile: str = typer.Option("exact", "--profile", help="Column stats: exact|sample|budget"),
+        sample_rows: int = typer.Option(100_000, "--sample-rows", help="Rows profiled per dataset in sample mode"),
+        profile_budget: float = typer.Option(0.25, "--profile-budget", help="Seconds per dataset in budget mode"),
+        async_stats: bool = typer.Option(False, "--async-stats", help="Compute column stats on background threads"),
+        capture: str = typer.Option("", "--capture", help="off|structure|schema|full (default: $LINEAGEKIT_CAPTURE or full)"),
+        ast_cache: str = typer.Option("", "--ast-cache", help="Optional: directory caching @transform source analysis"),
+        stream: bool = typer.Option(False, "--stream", help="Write lineage to the DB in batches while the script runs"),
+        flush_rows: int = typer.Option(5_000, "--flush-rows", help="Rows buffered before a streaming flush"),
+        impact_index: bool = typer.Option(False, "--impact-index", help="Materialize the impact index after persisting")):
     script_path = Path(script)
     if not script_path.exists():
         raise typer.BadParameter(f"{script} not found")
+    if profile not in ("exact", "sample", "budget"):
+        raise typer.BadParameter(f"unknown profile mode {profile!r}")
+    tracker.profiling = ProfilePolicy(mode=profile, rows=sample_rows, budget_s=profile_budget)
+    try:
+        # without --capture, LINEAGEKIT_CAPTURE is checked here rather than mid-script
+        tracker.capture_level = capture or tracker.capture_level
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    if async_stats:
+        tracker.enable_async_profiling()
+    if ast_cache:
+        set_ast_cache_dir(ast_cache)
+    if stream:
+        StreamingWriter(db, max_rows=flush_rows).start()
     print(f"[bold]> Running[/bold] {script_path}")
 
     runpy.run_path(str(script_path), run_name="__main__")
-    print(f"[green]✓ Script finished[/green]; run_id={tracker.run_id}")
+    print(f"[green]✓ Script finished[/green]; run_id={tracker.run_id} capture={tracker.capture_level.value}")
 
-    persist_current_run(db)
+    persist_current_run(db, build_index=impact_index)
+    tracker.disable_async_profiling()
     print(f"[green]✓ Persisted[/green] to {db}")
 
     if json_out:
@@ -35,15 +68,44 @@ def run(script: str = typer.Argument(..., help="Path to your pipeline script"),
 
 @app.command()
 def export(db: str = typer.Option("lineage.db", "--db"),
-           json_out: str = typer.Option("lineage_run.json", "--json")):
-    export_json_from_db(db, json_out)
-    print(f"[green]✓ Exported to JSON[/green] to {json_out}")
+           json_out: str = typer.Option("lineage_run.json", "--json", "--out",
+                                        help="Output path (.gz/.zst compress); a directory for parquet"),
+           fmt: str = typer.Option("json", "--format", help="json|ndjson|parquet"),
+           run_id: str = typer.Option("", "--run", help="Run to export (default: latest; parquet: all runs)"),
+           compression: str = typer.Option("auto", "--compression", help="auto|none|gzip|zstd")):
+    if fmt == "parquet":
+        runs = export_parquet(db, json_out, [run_id] if run_id else None)
+        print(f"[green]✓ Exported[/green] {len(runs)} run(s) as parquet to {json_out}/")
+        return
+    run_id = export_run(db, json_out, run_id or None, fmt=fmt, compression=compression)
+    print(f"[green]✓ Exported[/green] {run_id} as {fmt} to {json_out}")
+
+@app.command("import")
+def import_(path: str = typer.Argument(..., help="NDJSON export (.gz/.zst ok) or parquet export directory"),
+            db: str = typer.Option("lineage.db", "--db"),
+            run_id: str = typer.Option("", "--run", help="NDJSON: store under this run id; parquet: only this run"),
+            compression: str = typer.Option("auto", "--compression", help="auto|none|gzip|zstd")):
+    if Path(path).is_dir():
+        runs = import_parquet(db, path, [run_id] if run_id else None)
+        print(f"[green]✓ Imported[/green] {len(runs)} run(s) into {db}")
+        return
+    run_id = import_ndjson(db, path, run_id or None, compression=compression)
+    print(f"[green]✓ Imported[/green] {run_id} into {db}")
 
 @app.command()
 def ui(db: str = typer.Option("lineage.db", "--db")):
     ui_file = streamlit_app_path()
     subprocess.run(["streamlit", "run", str(ui_file), "--", "--db", db])
 
+@app.command()
+def migrate(db: str = typer.Option("lineage.db", "--db")):
+    conn = sqlite3.connect(db)
+    before = schema_version(conn)
+    conn.close()
+    conn = init_db(db)
+    print(f"[green]✓ Schema[/green] v{before} -> v{schema_version(conn)}")
+    conn.close()
+
 @app.command()
 def diff(base: str, curr: str, db: str = typer.Option("lineage.db", "--db"),
          save: str = typer.Option("", "--save", help="Optional: persist to 'changes' table")):
@@ -51,7 +113,7 @@ def diff(base: str, curr: str, db: str = typer.Option("lineage.db", "--db"),
     for ch in changes:
         print(f"[bold]{ch['change_type']}[/bold] {ch['node_id']} sev={ch['severity']} detail={ch['detail']}")
     if save:
-        conn = sqlite3.connect(db)
+        conn = open_db(db)
         cur = conn.cursor()
         cur.executemany("""
                   INSERT INTO changes(run_id,node_kind,node_id,change_type,detail,severity)
@@ -62,26 +124,96 @@ def diff(base: str, curr: str, db: str = typer.Option("lineage.db", "--db"),
         print(f"[green]✓ Saved[/green] {len(changes)} changes")
 
 @app.command()
-def impact(column_id: str,
+def drift(db: str = typer.Option("lineage.db", "--db"),
+          runs: int = typer.Option(50, "--runs", help="How many recent runs to load"),
+          window: int = typer.Option(20, "--window", help="Baseline runs before the scored run"),
+          method: str = typer.Option("mad", "--method", help="mad|ewma"),
+          threshold: float = typer.Option(3.5, "--threshold", help="Minimum drift score"),
+          run: str = typer.Option("", "--run", help="Run to score (default latest)"),
+          top: int = typer.Option(30, "--top")):
+    hits = detect_drift(db, runs=runs, window=window, method=method, threshold=threshold, run=run or None, top=top)
+    if not hits:
+        print("[yellow]No drift detected[/yellow]")
+        return
+    for h in hits:
+        print(f"{h['score']:8.2f} {h['metric']:9} {h['dataset']}.{h['column']}  "
+              f"{h['baseline']:.4g} -> {h['value']:.4g}")
+
+@app.command()
+def impact(column_ids: List[str] = typer.Argument(..., help="One or more column ids"),
            change: str = typer.Option(..., "--change", help="ChangeType, e.g. type_change"),
            db: str = typer.Option("lineage.db", "--db"),
            run: str = typer.Option("", "--run")):
     if not run:
-        conn = sqlite3.connect(db)
+        conn = open_db(db)
         run = latest_run_id(conn)
         conn.close()
-    hits = impact_bfs(db, run, column_id, change)
+    if len(column_ids) > 1:
+        # several origins: one batch traversal, max severity per column
+        max_sevs = impact_many(db, run, [(c, change) for c in column_ids])
+        for c in sorted(column_ids, key=lambda c: SEV_RANK.get(max_sevs[(c, change)], 0), reverse=True):
+            print(f"{max_sevs[(c, change)] or '-':9} {c}")
+        return
+    hits = impact_bfs(db, run, column_ids[0], change)
     hits.sort(key=lambda x: SEV_RANK[x[2]], reverse=True)
     for nid, kind, sev in hits[:50]:
         print(f"{sev:9} {kind:9} {nid}")
 
+@app.command()
+def trace(column: str = typer.Argument(..., help="Column id, <dataset_id>|<column> or dataset.column"),
+          down: bool = typer.Option(False, "--down/--up", help="Walk downstream instead of upstream"),
+          depth: int = typer.Option(10, "--depth"),
+          paths: bool = typer.Option(False, "--paths", help="Print whole paths instead of steps"),
+          db: str = typer.Option("lineage.db", "--db"),
+          run: str = typer.Option("", "--run")):
+    try:
+        steps = trace_column(db, column, run or None, "down" if down else "up", depth)
+    except ValueError as e:
+        print(f"[red]{e}[/red]")
+        raise typer.Exit(code=1)
+    arrow = "->" if down else "<-"
+    # edge endpoints without a captured column (e.g. unregistered inputs) are shown by id
+    name = lambda s: f"{s['dataset']}.{s['column']}" if s["column"] is not None else s["col_id"]
+    if paths:
+        for path in trace_paths(steps):
+            print(escape(f" {arrow} ".join(name(s) if not s["hop"] else f"[{s['transform']}] {arrow} {name(s)}" for s in path)))
+        return
+    for s in steps:
+        via = f"  {arrow} [{s['transform']}]" if s["hop"] else ""
+        print(escape(f"{s['hop']:3} {name(s)}{via}"))
+
+@app.command()
+def overhead(db: str = typer.Option("lineage.db", "--db"),
+             run: str = typer.Option("", "--run", help="Run to report (default latest)"),
+             top: int = typer.Option(20, "--top")):
+    rows = overhead_report(db, run or None, top)
+    if not rows:
+        print("[yellow]No overhead recorded for this run[/yellow]")
+        return
+    table = Table("function", "kind", "calls", "user s", "capture s", "ovh %", "stats s", "ast s", "graph s")
+    for r in rows:
+        table.add_row(escape(r["func"]), r["kind"], str(r["calls"]), f"{r['user_s']:.4f}", f"{r['capture_s']:.4f}",
+                      f"{r['overhead_pct']:.1f}", f"{r['stats_s']:.4f}", f"{r['ast_s']:.4f}", f"{r['graph_s']:.4f}")
+    print(table)
+
+@app.command()
+def index(db: str = typer.Option("lineage.db", "--db"),
+          run: str = typer.Option("", "--run"),
+          rebuild: bool = typer.Option(False, "--rebuild")):
+    if not run:
+        conn = open_db(db)
+        run = latest_run_id(conn)
+        conn.close()
+    n = build_impact_index(db, run, rebuild=rebuild)
+    print(f"[green]✓ Impact index[/green] for {run}: {n} origin columns")
+
 @app.command()
 def guard(db: str = typer.Option("lineage.db", "--db"),
           base: str= typer.Option(..., "--base", help="Baseline run_id"),
           curr: str = typer.Option("", "--curr", help="Current run_id (default latest)"),
           threshold: str = typer.Option("HIGH", "--threshold", help="LOW|MEDIUM|HIGH|CRITICAL")):
     if not curr:
-        conn = sqlite3.connect(db)
+        conn = open_db(db)
         curr = latest_run_id(conn)
         conn.close()
 
@@ -90,11 +222,10 @@ def guard(db: str = typer.Option("lineage.db", "--db"),
         print("[yellow]No changes detected[/yellow]")
         raise typer.Exit(0)
 
+    max_sevs = impact_many(db, curr, [(ch["node_id"], ch["change_type"]) for ch in changes])
     bad = []
     for ch in changes:
-        start = ch["node_id"]
-        sev_hits = impact_bfs(db, curr, start, ch["change_type"])
-        max_sev = max([SEV_RANK.get(s, 1) for _,_,s in sev_hits], default=0)
+        max_sev = SEV_RANK.get(max_sevs[(ch["node_id"], ch["change_type"])], 0)
         if max_sev >= SEV_RANK[threshold]:
             bad.append((ch, max_sev))
 
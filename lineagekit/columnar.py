@@ -0,0 +1,162 @@
+"""
+Columnar export/import of the store as hive-partitioned Parquet datasets,
+one per table, for analysis from notebooks:
+
+    out/column_stats/run_id=run_1712345678/part-0.parquet
+    out/columns/snapshot_id=9b7fad1f75b20c0f/part-0.parquet
+
+Per-run tables are partitioned by `run_id`. Graph structure is stored once
+per snapshot in the DB, so its tables are partitioned by `snapshot_id`
+(join through `runs`). Re-exporting a run replaces its partitions.
+Needs `pyarrow` (`pip install lineagekit[parquet]`).
+"""
+from typing import Dict, Iterator, List, Optional, Sequence
+from urllib.parse import quote
+import os, shutil, sqlite3
+
+from .store import STRUCTURE, init_db, open_db, _bump_write_seq, _table_columns
+
+PAGE_ROWS = 50_000
+
+# table -> partition column
+PARTITIONS: Dict[str, str] = {
+    "runs": "run_id",
+    "snapshots": "snapshot_id",
+    **{table: "snapshot_id" for table in STRUCTURE},
+    "dataset_rows": "run_id",
+    "column_stats": "run_id",
+    "changes": "run_id",
+    "call_overhead": "run_id",
+}
+# rowid-style keys that mean nothing outside their DB
+_SKIP_COLUMNS = {"changes": {"id"}}
+_ARROW_TYPES = {"TEXT": "string", "INTEGER": "int64", "REAL": "float64", "BLOB": "binary"}
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError:
+        raise ImportError("Parquet export needs the 'pyarrow' package (pip install lineagekit[parquet])") from None
+    return pyarrow, pyarrow.dataset
+
+def _partitioning(table: str):
+    pa, ds = _pyarrow()
+    return ds.partitioning(pa.schema([(PARTITIONS[table], pa.string())]), flavor="hive")
+
+def _schema(cur: sqlite3.Cursor, table: str):
+    pa, _ = _pyarrow()
+    skip = _SKIP_COLUMNS.get(table, set())
+    fields = [(name, getattr(pa, _ARROW_TYPES.get(typ.upper(), "string"))())
+              for _, name, typ, *_ in cur.execute(f"PRAGMA table_info({table})") if name not in skip]
+    return pa.schema(fields)
+
+def _batches(conn: sqlite3.Connection, table: str, schema, keys: Sequence[str],
+             page_rows: int) -> Iterator:
+    pa, _ = _pyarrow()
+    cols = ", ".join(f'"{name}"' for name in schema.names)
+    for key in keys:
+        # one partition at a time; every query is a primary-key (or index) prefix scan
+        cur = conn.execute(f"SELECT {cols} FROM {table} WHERE {PARTITIONS[table]} = ?", (key,))
+        while True:
+            rows = cur.fetchmany(page_rows)
+            if not rows:
+                break
+            arrays = [pa.array(list(values), type=field.type) for values, field in zip(zip(*rows), schema)]
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def export_parquet(db_path: str, out_dir: str, runs: Optional[Sequence[str]] = None,
+                   page_rows: int = PAGE_ROWS) -> List[str]:
+    """
+    Write `runs` (default: every finished run) and the snapshots they use
+    under `out_dir`, one dataset per table. Returns the exported run ids.
+    """
+    _, ds = _pyarrow()
+    # write_dataset pulls the batches from its own threads
+    conn = open_db(db_path, check_same_thread=False)
+    try:
+        # runs still streaming point at a staging snapshot; leave them out
+        if runs is None:
+            runs = [r[0] for r in conn.execute(
+                "SELECT run_id FROM runs WHERE snapshot_id NOT LIKE 'staging:%' ORDER BY created_at")]
+        known = {r: s or "" for r, s in conn.execute("SELECT run_id, snapshot_id FROM runs")}
+        missing = [r for r in runs if r not in known]
+        if missing:
+            raise ValueError(f"Unknown run(s): {', '.join(missing)}")
+        snapshots = sorted({known[r] for r in runs if not known[r].startswith("staging:")})
+        runs = [r for r in runs if not known[r].startswith("staging:")]
+        cur = conn.cursor()
+        for table, key in PARTITIONS.items():
+            schema = _schema(cur, table)
+            keys = runs if key == "run_id" else snapshots
+            if key == "run_id":
+                # delete_matching only replaces partitions that get rows; drop the runs' old ones outright
+                for r in runs:
+                    shutil.rmtree(os.path.join(out_dir, table, f"run_id={quote(r, safe='')}"), ignore_errors=True)
+            ds.write_dataset(_batches(conn, table, schema, keys, page_rows), os.path.join(out_dir, table),
+                             schema=schema, format="parquet", partitioning=_partitioning(table),
+                             basename_template="part-{i}.parquet", existing_data_behavior="delete_matching")
+    finally:
+        conn.close()
+    return list(runs)
+
+def open_table(path: str, table: str):
+    """
+    A `pyarrow.dataset.Dataset` over one exported table. Filter on the
+    partition column to read only those runs/snapshots, e.g.
+    `open_table(p, "column_stats").to_table(filter=ds.field("run_id") == r).to_pandas()`.
+    """
+    if table not in PARTITIONS:
+        raise ValueError(f"Unknown table {table!r}")
+    _, ds = _pyarrow()
+    return ds.dataset(os.path.join(path, table), format="parquet", partitioning=_partitioning(table))
+
+def _scan(path: str, table: str, keys: Optional[Sequence[str]], batch_rows: int):
+    if not os.path.isdir(os.path.join(path, table)):
+        return iter(())
+    _, ds = _pyarrow()
+    flt = ds.field(PARTITIONS[table]).isin(list(keys)) if keys is not None else None
+    return open_table(path, table).to_batches(filter=flt, batch_size=batch_rows)
+
+def import_parquet(db_path: str, path: str, runs: Optional[Sequence[str]] = None,
+                   batch_rows: int = PAGE_ROWS) -> List[str]:
+    """
+    Load exported runs (default: all in `path`) and their snapshots into
+    `db_path` in one transaction; existing rows of those runs are replaced.
+    Returns the imported run ids.
+    """
+    imported: Dict[str, str] = {}
+    for batch in _scan(path, "runs", runs, batch_rows):
+        imported.update(zip(batch.column("run_id").to_pylist(), batch.column("snapshot_id").to_pylist()))
+    snapshots = sorted(set(imported.values()))
+
+    conn = init_db(db_path)
+    cur = conn.cursor()
+    try:
+        # snapshots are content-addressed: rows already present are identical
+        for table in ["snapshots", *STRUCTURE, "runs", "dataset_rows", "column_stats", "changes", "call_overhead"]:
+            keys = list(imported) if PARTITIONS[table] == "run_id" else snapshots
+            verb = "INSERT OR IGNORE" if PARTITIONS[table] == "snapshot_id" else "INSERT OR REPLACE"
+            if table == "changes":
+                # no natural key; a re-import replaces the run's changes wholesale
+                cur.executemany("DELETE FROM changes WHERE run_id=?", [(r,) for r in keys])
+                verb = "INSERT"
+            target = set(_table_columns(cur, table))
+            for batch in _scan(path, table, keys, batch_rows):
+                cols = [c for c in batch.schema.names if c in target]
+                marks = ", ".join("?" * len(cols))
+                values = [batch.column(c).to_pylist() for c in cols]
+                cur.executemany(f"{verb} INTO {table}({', '.join(cols)}) VALUES ({marks})", zip(*values))
+        for run_id in imported:
+            # the exported counters belong to the source DB
+            _bump_write_seq(cur, run_id)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    from .graph_cache import invalidate
+    for run_id in imported:
+        invalidate(db_path, run_id)
+    return list(imported)
@@ -2,22 +2,30 @@ from typing import Literal, Optional
 import time, functools, inspect
 import pandas as pd
 
-from .lineage_tracker import tracker, _get_id, DatasetNode, ColumnNode, _stats_for
+from .chunked import ChunkStream, is_chunk_iterator, replace_chunk_arg
+from .lineage_tracker import tracker, _get_id, CaptureLevel, ProfilePolicy, _stats_for, _register_dataset
+from .overhead import timed_call
 
 def dataset(name: str,
             io: Literal["read", "write"],
             fmt: Optional[str] = None,
-            path: Optional[str] = None):
+            path: Optional[str] = None,
+            profile: Optional[ProfilePolicy] = None):
     def decorator(func):
         source_file = inspect.getsourcefile(func) or "<unknown>"
         source_line = inspect.getsourcelines(func)[1] if inspect.getsourcelines(func) else None
         sig = inspect.signature(func)
+        cost_key = f"{func.__module__}.{func.__qualname__}"
 
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            t0 = time.time()
+            if tracker.capture_level is CaptureLevel.OFF:
+                return func(*args, **kwargs)
+            with timed_call(tracker.overhead, cost_key, "dataset") as call:
+                return capture(call, *args, **kwargs)
 
-            res = func(*args, **kwargs)
+        def capture(call: timed_call, *args, **kwargs):
+            t0 = time.time()
 
             try:
                 bound = sig.bind_partial(*args, **kwargs)
@@ -30,30 +38,26 @@ def dataset(name: str,
             else:
                 runtime_path = path
 
+            if io == "write" and not any(isinstance(a, pd.DataFrame) for a in list(args) + list(kwargs.values())):
+                # chunks to write: track them as the function consumes them
+                dataset_id = _get_id("write", name, runtime_path or source_file, fmt)
+                args, kwargs, _ = replace_chunk_arg(args, kwargs, lambda it: ChunkStream(it, lambda chunk: _register_dataset(
+                    dataset_id, name, "sink", fmt, runtime_path, source_file, source_line, chunk, None, t0), profile))
+
+            res = call.user(func, *args, **kwargs)
+
             if io == "read":
                 df = res
+                dataset_id = _get_id("read", name, path or source_file, fmt)
                 if isinstance(df, pd.DataFrame):
-                    dataset_id = _get_id("read", name, path or source_file, fmt)
-                    dataset_node = DatasetNode(id=dataset_id,
-                                               name=name,
-                                               kind="source",
-                                               fmt=fmt,
-                                               path=path,
-                                               code_file=source_file,
-                                               code_line=source_line,
-                                               rows=len(df),
-                                               run_id=tracker.run_id,
-                                               created_at=t0)
-                    tracker.insert_dataset(dataset_node)
-                    df.attrs["__ds_id__"] = dataset_id
-                    cols = [ColumnNode(id=_get_id(dataset_id, col),
-                                       name=str(col),
-                                       dataset_id=dataset_id,
-                                       dtype=str(df[col].dtype),
-                                       run_id=tracker.run_id)
-                            for col in df.columns]
-                    tracker.insert_columns(cols)
-                    _stats_for(df, dataset_id)
+                    _register_dataset(dataset_id, name, "source", fmt, path, source_file, source_line,
+                                      df, len(df), t0)
+                    _stats_for(df, dataset_id, profile)
+                elif is_chunk_iterator(df):
+                    # chunked reader / generator of frames: register lazily from the first chunk
+                    return ChunkStream(df, lambda chunk: _register_dataset(
+                        dataset_id, name, "source", fmt, path, source_file, source_line, chunk, None, t0),
+                        profile)
                 return res
 
             elif io == "write":
@@ -67,26 +71,9 @@ def dataset(name: str,
                             break
                 if isinstance(df, pd.DataFrame):
                     dataset_id = _get_id("write", name, runtime_path or source_file, fmt)
-                    dataset_node = DatasetNode(id=dataset_id,
-                                               name=name,
-                                               kind="sink",
-                                               fmt=fmt,
-                                               path=runtime_path,
-                                               code_file=source_file,
-                                               code_line=source_line,
-                                               rows=len(df),
-                                               run_id=tracker.run_id,
-                                               created_at=t0)
-                    tracker.insert_dataset(dataset_node)
-                    df.attrs["__ds_id__"] = dataset_id
-                    cols = [ColumnNode(id=_get_id(dataset_id, col),
-                                       name=str(col),
-                                       dataset_id=dataset_id,
-                                       dtype=str(df[col].dtype),
-                                       run_id=tracker.run_id)
-                            for col in df.columns]
-                    tracker.insert_columns(cols)
-                    _stats_for(df, dataset_id)
+                    _register_dataset(dataset_id, name, "sink", fmt, runtime_path, source_file, source_line,
+                                      df, len(df), t0)
+                    _stats_for(df, dataset_id, profile)
                 return res
 
             else:
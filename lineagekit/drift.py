@@ -0,0 +1,153 @@
+"""
+Multi-run drift scoring. The column_stats of the last N runs are loaded as
+columns x runs arrays and every column is scored at once against a rolling
+baseline (median/MAD or EWMA) of the runs before the scored one.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import sqlite3, warnings
+
+import numpy as np
+import pandas as pd
+
+from .store import open_db
+
+METRICS = ("mean", "std", "null_rate")
+# null rates sitting at 0 have no spread; a 1pp move counts as one unit
+_ABS_FLOOR = {"mean": 0.0, "std": 0.0, "null_rate": 0.01}
+
+@dataclass
+class StatsMatrix:
+    run_ids: List[str]              # oldest -> newest
+    keys: np.ndarray                # "dataset_id|column" per row
+    values: Dict[str, np.ndarray]   # metric -> float64 [columns, runs], NaN where not profiled
+
+def _window_runs(conn: sqlite3.Connection, runs: int, until_run: Optional[str] = None) -> List[str]:
+    if until_run:
+        row = conn.execute("SELECT created_at FROM runs WHERE run_id=?", (until_run,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown run {until_run!r}")
+        cur = conn.execute("SELECT run_id FROM runs WHERE created_at <= ? ORDER BY created_at DESC LIMIT ?",
+                           (row[0], runs))
+    else:
+        cur = conn.execute("SELECT run_id FROM runs ORDER BY created_at DESC LIMIT ?", (runs,))
+    return [r[0] for r in cur][::-1]
+
+# Both walk the run's primary-key range, so rows come back in the same order.
+# Keys arrive as one delimited string per run (cheap to compare between runs);
+# null rates follow detect_changes' convention.
+_RUN_KEYS_SQL = """
+SELECT group_concat(key, char(31)) FROM (
+    SELECT dataset_id || '|' || column AS key FROM column_stats WHERE run_id = ? ORDER BY dataset_id, column)
+"""
+_RUN_STATS_SQL = """
+SELECT mean, std, COALESCE(nulls, 0) * 1.0 / COALESCE(NULLIF(count, 0), 1)
+FROM column_stats WHERE run_id = ? ORDER BY dataset_id, column
+"""
+
+def load_stats_matrix(db_path: str, runs: int = 50, until_run: Optional[str] = None) -> StatsMatrix:
+    known = pd.Index([], dtype=object)
+    per_run = []
+    prev_keys, pos = None, None
+    conn = open_db(db_path)
+    try:
+        run_ids = _window_runs(conn, runs, until_run)
+        for run_id in run_ids:
+            key_text = conn.execute(_RUN_KEYS_SQL, (run_id,)).fetchone()[0]
+            if not key_text:
+                per_run.append(None)
+                continue
+            if key_text != prev_keys:
+                # runs usually share their column set; only remap when it changes
+                run_keys = pd.Index(key_text.split("\x1f"))
+                new = run_keys.difference(known, sort=False)
+                if len(new):
+                    known = known.append(new)
+                pos, prev_keys = known.get_indexer(run_keys), key_text
+            per_run.append((pos, np.array(conn.execute(_RUN_STATS_SQL, (run_id,)).fetchall(), dtype="float64")))
+    finally:
+        conn.close()
+
+    values = {m: np.full((len(known), len(run_ids)), np.nan) for m in METRICS}
+    for r, entry in enumerate(per_run):
+        if entry is None:
+            continue
+        pos, stats = entry
+        for m, metric in enumerate(METRICS):
+            values[metric][pos, r] = stats[:, m]
+    return StatsMatrix(run_ids, np.asarray(known, dtype=object), values)
+
+def _mad_baseline(history: np.ndarray):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows
+        center = np.nanmedian(history, axis=1)
+        mad = np.nanmedian(np.abs(history - center[:, None]), axis=1)
+    return center, 1.4826 * mad
+
+def _ewma_baseline(history: np.ndarray, alpha: float):
+    # loops over runs only; each step is vectorized over all columns
+    center = np.full(history.shape[0], np.nan)
+    var = np.zeros(history.shape[0])
+    for t in range(history.shape[1]):
+        x = history[:, t]
+        seen = ~np.isnan(x)
+        first = seen & np.isnan(center)
+        center[first] = x[first]
+        upd = seen & ~first
+        d = x[upd] - center[upd]
+        center[upd] += alpha * d
+        var[upd] = (1 - alpha) * (var[upd] + alpha * d * d)
+    return center, np.sqrt(var)
+
+def score_drift(matrix: StatsMatrix, window: int = 20, method: str = "mad", min_runs: int = 3,
+                rel_floor: float = 0.01, alpha: float = 0.3) -> Dict[str, np.ndarray]:
+    """
+    Drift score of the newest run per metric: |x - baseline| / spread, over
+    the `window` runs before it. NaN where a column has fewer than
+    `min_runs` baseline points or is absent from the newest run.
+    """
+    out = {}
+    for metric, arr in matrix.values.items():
+        current = arr[:, -1]
+        history = arr[:, max(0, arr.shape[1] - 1 - window):-1]
+        if method == "mad":
+            center, spread = _mad_baseline(history)
+        elif method == "ewma":
+            center, spread = _ewma_baseline(history, alpha)
+        else:
+            raise ValueError(f"Unknown drift method {method!r} (mad|ewma)")
+        spread = np.maximum(spread, np.maximum(rel_floor * np.abs(center), _ABS_FLOOR[metric]))
+        diff = np.abs(current - center)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = np.where(spread > 0, diff / spread, np.where(diff > 0, np.inf, 0.0))
+        score[(~np.isnan(history)).sum(axis=1) < min_runs] = np.nan
+        out[metric] = (score, center, current)
+    return out
+
+def detect_drift(db_path: str, runs: int = 50, window: int = 20, method: str = "mad", threshold: float = 3.5,
+                 run: Optional[str] = None, top: Optional[int] = None, **kw) -> List[dict]:
+    """Columns of `run` (default latest) whose stats drifted, ranked by their worst metric."""
+    matrix = load_stats_matrix(db_path, runs, run)
+    if not len(matrix.keys) or len(matrix.run_ids) < 2:
+        return []
+    scored = score_drift(matrix, window, method, **kw)
+    scores = np.stack([scored[m][0] for m in METRICS])
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    worst = scores.argmax(axis=0)
+    best_score = scores[worst, np.arange(scores.shape[1])]
+    hits = np.flatnonzero(best_score >= threshold)
+    hits = hits[np.argsort(-best_score[hits], kind="stable")][:top]
+
+    conn = open_db(db_path)
+    names = dict(conn.execute("SELECT d.id, d.name FROM runs r JOIN datasets d ON d.snapshot_id = r.snapshot_id "
+                              "WHERE r.run_id=?", (matrix.run_ids[-1],)).fetchall())
+    conn.close()
+    out = []
+    for i in hits:
+        metric = METRICS[worst[i]]
+        _, center, current = scored[metric]
+        ds_id, col = matrix.keys[i].split("|", 1)
+        out.append({"node_id": matrix.keys[i], "dataset_id": ds_id, "dataset": names.get(ds_id, ds_id),
+                    "column": col, "metric": metric, "score": float(best_score[i]),
+                    "baseline": float(center[i]), "value": float(current[i])})
+    return out
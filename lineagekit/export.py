@@ -0,0 +1,263 @@
+"""
+Streaming export/import of runs. Rows are paged out of SQLite (or read off
+the tracker's views) and written as they come, so memory stays flat however
+large the run is. Two layouts:
+
+- json: the `{"run_id", "nodes": {...}, "edges": {...}}` document
+  `export_json_from_db` has always written. Snapshots no longer keep
+  per-transform times, so a transform's `created_at` is the run's
+- ndjson: a `{"table": "run", ...}` header line (with the run's snapshot
+  id, created_at and capture level), then one record per line tagged with
+  its table (`datasets`, ..., `transform_to_column`, `column_stats`,
+  `call_overhead`);
+  `import_ndjson` loads it back into a DB
+
+Paths ending in .gz or .zst/.zstd are compressed (zstd needs `zstandard`).
+"""
+from dataclasses import asdict
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import gzip, itertools, json, os, sqlite3
+
+from .lineage_tracker import current_tracker, LineageTracker
+from .store import (RUN_QUERIES, STRUCTURE, init_db, latest_run_id, open_db, run_capture_level, snapshot_for, _finalize_snapshot,
+                    _write_run, _write_structure)
+
+NDJSON_VERSION = 1
+PAGE_ROWS = 10_000
+
+# (section, record key, DB table) in document order
+SECTIONS = [
+    ("nodes", "datasets", "datasets"),
+    ("nodes", "columns", "columns"),
+    ("nodes", "transforms", "transforms"),
+    ("edges", "dataset_to_transform", "dataset_to_transform_edges"),
+    ("edges", "transform_to_dataset", "transform_to_dataset_edges"),
+    ("edges", "column_to_transform", "column_to_transform_edges"),
+    ("edges", "transform_to_column", "transform_to_column_edges"),
+]
+_TABLE_OF = {key: table for _, key, table in SECTIONS}
+_STAT_FIELDS = ["dataset_id", "column", "dtype", "count", "nulls", "mean", "std", "top", "top_freq",
+                "sample_rows", "confidence"]
+_OVERHEAD_FIELDS = ["func", "kind", "calls", "user_s", "stats_s", "ast_s", "graph_s"]
+# per-run records only NDJSON carries
+_NDJSON_ONLY = {"column_stats", "call_overhead"}
+# tracker row kinds behind each record key (edges keep their dataclass field names)
+_TRACKER_KINDS = {"datasets": "datasets", "columns": "columns", "transforms": "transforms",
+                  "dataset_to_transform": "dataset_to_transform", "transform_to_dataset": "transform_to_dataset",
+                  "column_to_transform": "col_to_transform", "transform_to_column": "transform_to_col"}
+
+def _compression(path: str, compression: str) -> Optional[str]:
+    if compression == "auto":
+        if path.endswith(".gz"):
+            return "gzip"
+        if path.endswith((".zst", ".zstd")):
+            return "zstd"
+        return None
+    if compression in ("none", ""):
+        return None
+    if compression not in ("gzip", "zstd"):
+        raise ValueError(f"Unknown compression {compression!r} (auto|none|gzip|zstd)")
+    return compression
+
+def open_text(path: str, mode: str = "rt", compression: str = "auto"):
+    """Text stream over a plain, gzip or zstd file."""
+    comp = _compression(str(path), compression)
+    if comp == "gzip":
+        return gzip.open(path, mode, compresslevel=6, encoding="utf-8")
+    if comp == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compression needs the 'zstandard' package (pip install lineagekit[zstd])") from None
+        return zstandard.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def _paged(conn: sqlite3.Connection, sql: str, params, page_rows: int) -> Iterator[Dict[str, Any]]:
+    cur = conn.execute(sql, params)
+    cols = [c[0] for c in cur.description]
+    while True:
+        rows = cur.fetchmany(page_rows)
+        if not rows:
+            return
+        for r in rows:
+            yield dict(zip(cols, r))
+
+def _db_records(conn: sqlite3.Connection, run_id: str, snapshot_id: str, page_rows: int):
+    params = {"run_id": run_id, "snapshot_id": snapshot_id}
+    for _, key, table in SECTIONS:
+        yield key, _paged(conn, RUN_QUERIES[table], params, page_rows)
+    yield "column_stats", _paged(conn, "SELECT * FROM column_stats WHERE run_id = :run_id", params, page_rows)
+    yield "call_overhead", _paged(conn, f"SELECT {', '.join(_OVERHEAD_FIELDS)} FROM call_overhead WHERE run_id = :run_id",
+                                  params, page_rows)
+
+def _tracker_records(t: LineageTracker):
+    rows = t.rows()
+    for key, kind in _TRACKER_KINDS.items():
+        view = rows[kind]
+        if hasattr(view, "table"):
+            fields = view.table.fields
+            yield key, (dict(zip(fields, r)) for r in view.tuples())
+        else:
+            yield key, (asdict(x) for x in view)
+    yield "column_stats", (asdict(s) for s in rows["column_stats"])
+    yield "call_overhead", (dict(zip(_OVERHEAD_FIELDS, r)) for r in t.overhead.rows())
+
+def _batches(recs: Iterable[dict], size: int = 1_000):
+    it = iter(recs)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def _write_json(f, header: Dict[str, Any], records: Iterable[Tuple[str, Iterable[dict]]]):
+    # same bytes json.dump gives for the nested document, without building it
+    f.write("{" + ", ".join(f"{json.dumps(k)}: {json.dumps(v)}" for k, v in header.items()))
+    section_of = {key: sec for sec, key, _ in SECTIONS}
+    section = None
+    for key, recs in records:
+        if section_of[key] != section:
+            f.write(("}" if section else "") + f", {json.dumps(section_of[key])}: {{")
+            section = section_of[key]
+        else:
+            f.write(", ")
+        f.write(f"{json.dumps(key)}: [")
+        sep = ""
+        for batch in _batches(recs):
+            f.write(sep + ", ".join(map(json.dumps, batch)))
+            sep = ", "
+        f.write("]")
+    f.write("}}")
+
+def _write_ndjson(f, header: Dict[str, Any], records: Iterable[Tuple[str, Iterable[dict]]]):
+    f.write(json.dumps({"table": "run", "version": NDJSON_VERSION, **header}) + "\n")
+    for key, recs in records:
+        for batch in _batches(recs):
+            f.write("".join(json.dumps({"table": key, **rec}) + "\n" for rec in batch))
+
+def _write(path: str, fmt: str, compression: str, header: Dict[str, Any], records):
+    if fmt not in ("json", "ndjson"):
+        raise ValueError(f"Unknown export format {fmt!r} (json|ndjson)")
+    path = os.fspath(path)
+    comp = _compression(path, compression)
+    # written next to the target and renamed, so readers never see half a file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open_text(tmp, "wt", comp or "none") as f:
+            (_write_json if fmt == "json" else _write_ndjson)(f, header, records)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def export_run(db_path: str, path: str, run_id: Optional[str] = None, fmt: str = "json",
+               compression: str = "auto", page_rows: int = PAGE_ROWS) -> str:
+    """Stream one run (latest when omitted) from the DB to `path`; returns the run id."""
+    conn = open_db(db_path)
+    try:
+        run_id = run_id or latest_run_id(conn)
+        row = conn.execute("SELECT created_at, snapshot_id FROM runs WHERE run_id=?", (run_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown run {run_id!r}")
+        snapshot_id = row[1] or snapshot_for(conn, run_id)
+        header = {"run_id": run_id}
+        records = _db_records(conn, run_id, snapshot_id, page_rows)
+        if fmt == "ndjson":
+            header.update(snapshot_id=snapshot_id, created_at=row[0],
+                          capture_level=run_capture_level(conn, run_id).value)
+        else:
+            # the JSON document keeps its original layout: no stats section, transforms with created_at
+            records = ((k, ({**rec, "created_at": row[0]} for rec in recs) if k == "transforms" else recs)
+                       for k, recs in records if k not in _NDJSON_ONLY)
+        _write(path, fmt, compression, header, records)
+    finally:
+        conn.close()
+    return run_id
+
+def export_tracker(path: str, fmt: str = "json", compression: str = "auto", t: Optional[LineageTracker] = None):
+    """Stream the in-memory run (`tracker.export_json()` layout) to `path` without building the document."""
+    t = t or current_tracker()
+    records = _tracker_records(t)
+    if fmt == "json":
+        records = ((k, r) for k, r in records if k not in _NDJSON_ONLY)
+    _write(path, fmt, compression, {"run_id": t.run_id}, records)
+
+def iter_ndjson(path: str, compression: str = "auto") -> Iterator[Dict[str, Any]]:
+    """Records of an NDJSON export, header first."""
+    with open_text(path, "rt", compression) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def import_ndjson(db_path: str, path: str, run_id: Optional[str] = None, compression: str = "auto",
+                  batch_rows: int = PAGE_ROWS) -> str:
+    """
+    Load an NDJSON export into `db_path` as run `run_id` (default: the
+    exported id), in one transaction. Structure is staged and folded into
+    its content-addressed snapshot like a streamed run. Returns the run id.
+    """
+    records = iter_ndjson(path, compression)
+    header = next(records, None)
+    if not header or header.get("table") != "run":
+        raise ValueError(f"{path}: not a lineagekit NDJSON export (missing run header)")
+    if header.get("version", 1) > NDJSON_VERSION:
+        raise ValueError(f"{path}: export version {header['version']} is newer than this lineagekit")
+    run_id = run_id or header["run_id"]
+    staged_id = f"staging:{run_id}"
+    structure: Dict[str, list] = {table: [] for table in STRUCTURE}
+    row_counts: list = []
+    stats: list = []
+    overhead: list = []
+
+    conn = init_db(db_path)
+    cur = conn.cursor()
+
+    def flush():
+        _write_structure(cur, staged_id, structure)
+        cur.executemany("INSERT OR REPLACE INTO dataset_rows(run_id, dataset_id, rows) VALUES (?, ?, ?)", row_counts)
+        cur.executemany(f"""
+            INSERT OR REPLACE INTO column_stats({', '.join(_STAT_FIELDS)}, run_id)
+            VALUES ({', '.join('?' * (len(_STAT_FIELDS) + 1))})""", stats)
+        cur.executemany(f"""
+            INSERT OR REPLACE INTO call_overhead(run_id, {', '.join(_OVERHEAD_FIELDS)})
+            VALUES ({', '.join('?' * (len(_OVERHEAD_FIELDS) + 1))})""", overhead)
+        for rows in structure.values():
+            rows.clear()
+        row_counts.clear()
+        stats.clear()
+        overhead.clear()
+
+    try:
+        _write_run(cur, run_id, staged_id, header.get("capture_level"))
+        if header.get("created_at") is not None:
+            cur.execute("UPDATE runs SET created_at=? WHERE run_id=?", (header["created_at"], run_id))
+        pending = 0
+        for rec in records:
+            key = rec.get("table")
+            if key == "column_stats":
+                stats.append(tuple(rec.get(f) for f in _STAT_FIELDS) + (run_id,))
+            elif key == "call_overhead":
+                overhead.append((run_id,) + tuple(rec.get(f) for f in _OVERHEAD_FIELDS))
+            elif key in _TABLE_OF:
+                table = _TABLE_OF[key]
+                structure[table].append(tuple(rec.get(f) for f in STRUCTURE[table]))
+                if table == "datasets":
+                    row_counts.append((run_id, rec["id"], rec.get("rows")))
+            else:
+                raise ValueError(f"{path}: unknown record table {key!r}")
+            pending += 1
+            if pending >= batch_rows:
+                flush()
+                pending = 0
+        flush()
+        _finalize_snapshot(cur, staged_id)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    from .graph_cache import invalidate
+    invalidate(db_path, run_id)
+    return run_id
@@ -0,0 +1,161 @@
+"""
+Shared, in-process cache of parsed run graphs.
+
+`load_run_graph(db_path, run_id)` returns a `RunGraph` (nodes, edges, column
+stats and impact adjacency of one run) and keeps it in an LRU keyed by
+(db_path, run_id), bounded by an approximate memory cap. Entries are
+revalidated against the run's row in `runs` on every lookup and dropped by
+`invalidate()`, which `persist_current_run`/`StreamingWriter` call when a
+run is (re)written from this process.
+"""
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import os, sqlite3, sys, threading
+
+from .store import open_db, run_rows, snapshot_for, latest_run_id
+
+NODE_TABLES = [("datasets", "datasets"), ("columns", "columns"), ("transforms", "transforms")]
+EDGE_TABLES = [
+    ("dataset_to_transform_edges", "dataset_to_transform"),
+    ("transform_to_dataset_edges", "transform_to_dataset"),
+    ("column_to_transform_edges", "column_to_transform"),
+    ("transform_to_column_edges", "transform_to_column"),
+]
+
+@dataclass
+class RunGraph:
+    run_id: str
+    snapshot_id: str
+    nodes: Dict[str, List[Dict[str, Any]]]
+    edges: Dict[str, List[Dict[str, Any]]]
+    stats: Dict[Tuple[str, str], Dict[str, Any]]
+    token: Tuple[Any, ...] = ()
+    nbytes: int = 0
+    _adjacency: Optional[tuple] = field(default=None, repr=False)
+
+    def adjacency(self):
+        """(col_to_tr, tr_to_col, tr_tags) as used by impact analysis."""
+        if self._adjacency is None:
+            col_to_tr, tr_to_col = defaultdict(list), defaultdict(list)
+            for e in self.edges["column_to_transform"]:
+                col_to_tr[e["src_col_id"]].append(e["transform_id"])
+            for e in self.edges["transform_to_column"]:
+                tr_to_col[e["transform_id"]].append(e["dest_col_id"])
+            tr_tags = defaultdict(list)
+            for t in self.nodes["transforms"]:
+                tr_tags[t["id"]] = []
+            self._adjacency = (col_to_tr, tr_to_col, tr_tags)
+        return self._adjacency
+
+def _run_token(conn: sqlite3.Connection, run_id: str):
+    # write_seq changes on every write to the run, from any process
+    return conn.execute("SELECT created_at, snapshot_id, write_seq FROM runs WHERE run_id=?", (run_id,)).fetchone()
+
+def _approx_nbytes(tables: List[List[Dict[str, Any]]]) -> int:
+    total = 0
+    for rows in tables:
+        if not rows:
+            continue
+        sample = rows[:64]
+        per_row = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r.values()) for r in sample) / len(sample)
+        total += int(per_row * len(rows))
+    return total
+
+def _load(conn: sqlite3.Connection, run_id: str) -> RunGraph:
+    snapshot_id = snapshot_for(conn, run_id)
+    nodes, edges = {}, {}
+    for table, key in NODE_TABLES:
+        cols, rows = run_rows(conn, run_id, table, snapshot_id)
+        nodes[key] = [dict(zip(cols, r)) for r in rows]
+    for table, key in EDGE_TABLES:
+        cols, rows = run_rows(conn, run_id, table, snapshot_id)
+        edges[key] = [dict(zip(cols, r)) for r in rows]
+    cur = conn.execute("SELECT * FROM column_stats WHERE run_id = ?", (run_id,))
+    cols = [c[0] for c in cur.description]
+    stats = {}
+    for r in cur.fetchall():
+        d = dict(zip(cols, r))
+        stats[(d["dataset_id"], d["column"])] = d
+    g = RunGraph(run_id=run_id, snapshot_id=snapshot_id, nodes=nodes, edges=edges, stats=stats)
+    g.nbytes = _approx_nbytes(list(nodes.values()) + list(edges.values()) + [list(stats.values())])
+    return g
+
+class GraphCache:
+    """LRU of RunGraphs keyed by (db path, run_id), capped at roughly `max_bytes`."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], RunGraph]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def _key(db_path: str, run_id: str):
+        return (os.path.abspath(db_path), run_id)
+
+    def get(self, db_path: str, run_id: Optional[str] = None) -> RunGraph:
+        conn = open_db(db_path)
+        try:
+            run_id = run_id or latest_run_id(conn)
+            token = _run_token(conn, run_id)
+            key = self._key(db_path, run_id)
+            with self._lock:
+                g = self._entries.get(key)
+                if g is not None and g.token == token:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return g
+            g = _load(conn, run_id)
+            g.token = token
+        finally:
+            conn.close()
+        with self._lock:
+            self.misses += 1
+            self._pop(key)
+            # runs still streaming (staging snapshot) change under us; don't keep them
+            if not g.snapshot_id.startswith("staging:") and g.nbytes <= self.max_bytes:
+                self._entries[key] = g
+                self._bytes += g.nbytes
+                while self._bytes > self.max_bytes:
+                    self._pop(next(iter(self._entries)))
+        return g
+
+    def _pop(self, key):
+        g = self._entries.pop(key, None)
+        if g is not None:
+            self._bytes -= g.nbytes
+
+    def resize(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self._entries and self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, db_path: str, run_id: Optional[str] = None):
+        with self._lock:
+            db = os.path.abspath(db_path)
+            for key in [k for k in self._entries if k[0] == db and (run_id is None or k[1] == run_id)]:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+cache = GraphCache()
+
+def load_run_graph(db_path: str, run_id: Optional[str] = None) -> RunGraph:
+    """Cached RunGraph for a run (latest when omitted). Shared between callers: treat as read-only."""
+    return cache.get(db_path, run_id)
+
+def invalidate(db_path: str, run_id: Optional[str] = None):
+    cache.invalidate(db_path, run_id)
+
+def set_cache_limit(max_bytes: int):
+    cache.resize(max_bytes)
@@ -1,32 +1,20 @@
 from collections import deque, defaultdict
-import sqlite3, json
+from typing import Dict, Iterable, List, Optional, Tuple
+import sqlite3, json, struct
+
+from .lineage_tracker import ChangeType, _col_id
+from .store import snapshot_for, init_db, open_db
+from .graph_cache import load_run_graph
 
 SEV_RANK = {"LOW":1,"MEDIUM":2,"HIGH":3,"CRITICAL":4}
+RANK_SEV = {v: k for k, v in SEV_RANK.items()}
 
 def severity_for(change_type: str, tr_tags: list[str]):
     if change_type in ("schema_drop", "type_change"): return "CRITICAL"
     if any(t in tr_tags for t in ("agg", "model", "sklearn")): return "MEDIUM"
     return "LOW"
 
-def impact_bfs(db_path: str, run_id: str, start_col_id: str, change_type: str):
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-
-    cur.execute("SELECT src_col_id, transform_id FROM column_to_transform_edges WHERE run_id=?", (run_id,))
-    col_to_tr = defaultdict(list)
-    for c, t in cur.fetchall(): col_to_tr[c].append(t)
-    cur.execute("SELECT transform_id, dest_col_id FROM transform_to_column_edges WHERE run_id=?", (run_id,))
-    tr_to_col = defaultdict(list)
-    for t, c in cur.fetchall(): tr_to_col[t].append(c)
-
-    tr_tags = defaultdict(list)
-    try:
-        cur.execute("SELECT id, params_hash, name FROM transforms WHERE run_id=?", (run_id,))
-        for tid, _, _ in cur.fetchall():
-            tr_tags[tid] = []
-    except Exception:
-        pass
-
+def _bfs(col_to_tr, tr_to_col, tr_sev: Dict[str, str], start_col_id: str):
     q = deque([(start_col_id, "LOW")])
     best = {start_col_id: "LOW"}
     hits = []  # (node_id, kind, severity)
@@ -35,7 +23,7 @@ def impact_bfs(db_path: str, run_id: str, start_col_id: str, change_type: str):
         node, sev = q.popleft()
         # step to transforms
         for tr in col_to_tr.get(node, []):
-            s = severity_for(change_type, tr_tags[tr])
+            s = tr_sev[tr]
             if SEV_RANK[s] > SEV_RANK[best.get(tr, "LOW")]:
                 best[tr] = s
                 q.append((tr, s))
@@ -46,6 +34,182 @@ def impact_bfs(db_path: str, run_id: str, start_col_id: str, change_type: str):
                     best[outc] = s
                     q.append((outc, s))
                     hits.append((outc, "column", s))
-    conn.close()
+    return hits
+
+class _TrSeverity(dict):
+    # transform id -> severity for one change type, computed on first use
+    def __init__(self, change_type, tr_tags):
+        super().__init__()
+        self.change_type, self.tr_tags = change_type, tr_tags
+
+    def __missing__(self, tr):
+        s = self[tr] = severity_for(self.change_type, self.tr_tags[tr])
+        return s
+
+def impact_bfs(db_path: str, run_id: str, start_col_id: str, change_type: str, use_index: bool = True):
+    if use_index:
+        conn = open_db(db_path)
+        hits = _index_lookup(conn.cursor(), snapshot_for(conn, run_id), start_col_id, change_type)
+        conn.close()
+        if hits is not None:
+            return hits
+
+    col_to_tr, tr_to_col, tr_tags = load_run_graph(db_path, run_id).adjacency()
+    return _bfs(col_to_tr, tr_to_col, _TrSeverity(change_type, tr_tags), start_col_id)
+
+def _resolve_col_id(node_id: str) -> str:
+    # detect_changes reports columns as "<dataset_id>|<column>"
+    if "|" in node_id:
+        ds_id, col = node_id.split("|", 1)
+        return _col_id(ds_id, col)
+    return node_id
+
+def _max_downstream(inputs, producers, tr_sev: Dict[str, str]) -> Dict[str, int]:
+    """
+    Column -> highest severity rank impact_bfs would report from it, for all
+    columns at once: reverse BFS from the transforms of each severity level,
+    highest first, only through transforms severe enough for impact_bfs to
+    expand (above LOW).
+    """
+    open_tr = {t for t, s in tr_sev.items() if SEV_RANK[s] > SEV_RANK["LOW"]}
+    level: Dict[str, int] = {}
+    for rank in sorted({SEV_RANK[tr_sev[t]] for t in open_tr}, reverse=True):
+        seeds = [t for t in open_tr if SEV_RANK[tr_sev[t]] == rank]
+        seen = set(seeds)
+        q = deque(seeds)
+        while q:
+            tr = q.popleft()
+            for c in inputs.get(tr, []):
+                if c in level:  # already reaches this level or higher, as does everything upstream
+                    continue
+                level[c] = rank
+                for p in producers.get(c, []):
+                    if p in open_tr and p not in seen:
+                        seen.add(p)
+                        q.append(p)
+    return level
+
+def impact_many(db_path: str, run_id: str,
+                changes: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[str]]:
+    """
+    Batch impact: for each (column id, change type) the maximum severity
+    impact_bfs would report downstream, or None when nothing is hit. The
+    run graph is loaded once and each distinct severity regime costs one
+    multi-source traversal, however many changes are passed. Column ids
+    may also be given as detect_changes' "<dataset_id>|<column>".
+    """
+    changes = list(changes)
+    col_to_tr, tr_to_col, tr_tags = load_run_graph(db_path, run_id).adjacency()
 
-    return hits
\ No newline at end of file
+    inputs, producers = defaultdict(list), defaultdict(list)
+    for c, trs in col_to_tr.items():
+        for t in trs:
+            inputs[t].append(c)
+    for t, cs in tr_to_col.items():
+        for c in cs:
+            producers[c].append(t)
+    transforms = sorted(set(inputs) | set(tr_to_col))
+
+    levels_by_regime: Dict[Tuple[str, ...], Dict[str, int]] = {}
+    levels_by_type: Dict[str, Dict[str, int]] = {}
+    for change_type in {ct for _, ct in changes}:
+        sev = tuple(severity_for(change_type, tr_tags[t]) for t in transforms)
+        if sev not in levels_by_regime:
+            levels_by_regime[sev] = _max_downstream(inputs, producers, dict(zip(transforms, sev)))
+        levels_by_type[change_type] = levels_by_regime[sev]
+
+    out = {}
+    for origin, change_type in changes:
+        rank = levels_by_type[change_type].get(_resolve_col_id(origin))
+        out[(origin, change_type)] = RANK_SEV[rank] if rank else None
+    return out
+
+# --- materialized downstream closure -------------------------------------
+#
+# Per snapshot, every column's impact_bfs result is stored for each distinct
+# "regime" (the transform -> severity map a change type induces; change types
+# sharing a map share a regime). Node ids are interned to ordinals and each
+# origin's hits are packed into one blob: n little-endian uint32 ordinals
+# followed by n uint8 severity ranks, in BFS order. Snapshots are immutable,
+# so an index never goes stale.
+
+def _pack_hits(hits: List[Tuple[str, str, str]], ords: Dict[str, int]) -> bytes:
+    n = len(hits)
+    return struct.pack(f"<{n}I{n}B", *[ords[h[0]] for h in hits], *[SEV_RANK[h[2]] for h in hits])
+
+def _unpack_hits(blob: bytes, nodes: Dict[int, Tuple[str, str]]):
+    n = len(blob) // 5
+    vals = struct.unpack(f"<{n}I{n}B", blob)
+    return [(*nodes[o], RANK_SEV[r]) for o, r in zip(vals[:n], vals[n:])]
+
+def _index_lookup(cur: sqlite3.Cursor, snapshot_id: str, start_col_id: str, change_type: str):
+    """Indexed hits, or None when this snapshot/change type has no index."""
+    try:
+        row = cur.execute("SELECT regime FROM impact_regimes WHERE snapshot_id=? AND change_type=?",
+                          (snapshot_id, change_type)).fetchone()
+    except sqlite3.OperationalError:  # DB predates the index tables
+        return None
+    if row is None:
+        return None
+    blob = cur.execute("SELECT hits FROM impact_index WHERE snapshot_id=? AND regime=? AND origin=?",
+                       (snapshot_id, row[0], start_col_id)).fetchone()
+    if blob is None:
+        return []
+    n = len(blob[0]) // 5
+    ords = sorted(set(struct.unpack(f"<{n}I", blob[0][:4 * n])))
+    nodes = {}
+    for i in range(0, len(ords), 500):
+        part = ords[i:i + 500]
+        cur.execute(f"SELECT ord, node_id, kind FROM impact_nodes WHERE snapshot_id=? AND ord IN ({','.join('?' * len(part))})",
+                    (snapshot_id, *part))
+        nodes.update({o: (nid, kind) for o, nid, kind in cur.fetchall()})
+    return _unpack_hits(blob[0], nodes)
+
+def build_impact_index(db_path: str, run_id: str, rebuild: bool = False) -> int:
+    """
+    Materialize impact_bfs for every column of the run's snapshot. Snapshots
+    that already have an index are left alone unless `rebuild`. Returns the
+    number of origin columns with a non-empty closure.
+    """
+    conn = init_db(db_path)
+    cur = conn.cursor()
+    snapshot_id = snapshot_for(conn, run_id)
+    if not snapshot_id or snapshot_id.startswith("staging:"):
+        conn.close()
+        raise ValueError(f"run {run_id!r} has no finished snapshot to index")
+    if not rebuild and cur.execute("SELECT 1 FROM impact_regimes WHERE snapshot_id=?", (snapshot_id,)).fetchone():
+        n = cur.execute("SELECT COUNT(*) FROM impact_index WHERE snapshot_id=?", (snapshot_id,)).fetchone()[0]
+        conn.close()
+        return n
+    col_to_tr, tr_to_col, tr_tags = load_run_graph(db_path, run_id).adjacency()
+
+    nodes = sorted({t for ts in col_to_tr.values() for t in ts} | set(tr_to_col))
+    node_kind = {t: "transform" for t in nodes}
+    for cs in tr_to_col.values():
+        for c in cs:
+            node_kind.setdefault(c, "column")
+    ords = {nid: i for i, nid in enumerate(sorted(node_kind))}
+
+    regimes: Dict[Tuple[str, ...], int] = {}
+    change_regime = {}
+    for ct in ChangeType:
+        sev = tuple(severity_for(ct.value, tr_tags[t]) for t in nodes)
+        change_regime[ct.value] = regimes.setdefault(sev, len(regimes))
+
+    cur.execute("BEGIN")
+    for table in ("impact_nodes", "impact_regimes", "impact_index"):
+        cur.execute(f"DELETE FROM {table} WHERE snapshot_id=?", (snapshot_id,))
+    cur.executemany("INSERT INTO impact_nodes(snapshot_id, ord, node_id, kind) VALUES (?, ?, ?, ?)",
+                    [(snapshot_id, o, nid, node_kind[nid]) for nid, o in ords.items()])
+    cur.executemany("INSERT INTO impact_regimes(snapshot_id, change_type, regime) VALUES (?, ?, ?)",
+                    [(snapshot_id, ct, r) for ct, r in change_regime.items()])
+    for sev, regime in regimes.items():
+        tr_sev = dict(zip(nodes, sev))
+        cur.executemany("INSERT INTO impact_index(snapshot_id, regime, origin, hits) VALUES (?, ?, ?, ?)",
+                        ((snapshot_id, regime, origin, _pack_hits(hits, ords))
+                         for origin in col_to_tr
+                         for hits in [_bfs(col_to_tr, tr_to_col, tr_sev, origin)] if hits))
+    n = cur.execute("SELECT COUNT(*) FROM impact_index WHERE snapshot_id=?", (snapshot_id,)).fetchone()[0]
+    conn.commit()
+    conn.close()
+    return n
@@ -0,0 +1,123 @@
+"""
+Layered (Sugiyama-style) layout for lineage DAGs, and a layout cache in the
+DB so unchanged graphs are not laid out again on every UI rerender.
+
+Layers come from longest-path ranking in topological order, and the order
+within each layer from barycenter sweeps. Edges that span several layers
+are drawn straight rather than routed through dummy nodes. That keeps the
+whole layout linear in the graph size, apart from sorting each layer.
+"""
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Sequence, Tuple
+import hashlib, json, os, sqlite3, time
+
+from .store import open_db
+
+# bump when the algorithm changes so cached positions are recomputed
+LAYOUT_VERSION = 1
+# cached layouts kept per DB; the oldest are dropped beyond this
+MAX_CACHED = 5_000
+
+Positions = Dict[str, Tuple[float, float]]
+
+def layered_layout(nodes: Iterable[str], edges: Iterable[Tuple[str, str]], sweeps: int = 8) -> Positions:
+    """{node: (x, y)}: x is the layer (sources at 0), y the centered slot within the layer."""
+    nodes = list(dict.fromkeys(nodes))
+    succ: Dict[str, List[str]] = {n: [] for n in nodes}
+    pred: Dict[str, List[str]] = {n: [] for n in nodes}
+    for u, v in edges:
+        if u in succ and v in succ and u != v:
+            succ[u].append(v)
+            pred[v].append(u)
+
+    # longest-path layering (Kahn order)
+    indeg = {n: len(pred[n]) for n in nodes}
+    layer = dict.fromkeys(nodes, 0)
+    queue = deque(n for n in nodes if not indeg[n])
+    order: List[str] = []
+    while queue:
+        n = queue.popleft()
+        order.append(n)
+        for m in succ[n]:
+            layer[m] = max(layer[m], layer[n] + 1)
+            indeg[m] -= 1
+            if not indeg[m]:
+                queue.append(m)
+    if len(order) < len(nodes):
+        # lineage graphs are DAGs; should a cycle sneak in, place its nodes after what is placed so far
+        placed = set(order)
+        for n in nodes:
+            if n not in placed:
+                layer[n] = 1 + max((layer[p] for p in pred[n] if p in placed), default=-1)
+                placed.add(n)
+                order.append(n)
+
+    layers: Dict[int, List[str]] = defaultdict(list)
+    for n in order:
+        layers[layer[n]].append(n)
+    slot: Dict[str, float] = {}
+
+    def place(level: int):
+        row = layers[level]
+        mid = (len(row) - 1) / 2
+        for i, n in enumerate(row):
+            slot[n] = i - mid
+
+    for level in layers:
+        place(level)
+    # barycenter sweeps, alternately down (by predecessors) and up (by successors)
+    for s in range(sweeps):
+        down = s % 2 == 0
+        neighbors = pred if down else succ
+        for level in sorted(layers, reverse=not down)[1:]:
+            def barycenter(n):
+                ns = neighbors[n]
+                return sum(slot[m] for m in ns) / len(ns) if ns else slot[n]
+            layers[level].sort(key=barycenter)
+            place(level)
+    return {n: (float(layer[n]), -slot[n]) for n in nodes}
+
+def graph_key(nodes: Iterable[str], edges: Iterable[Tuple[str, str]]) -> str:
+    """Structural hash of a drawn graph: its node and edge sets, order-independent."""
+    h = hashlib.sha1()
+    for n in sorted(set(nodes)):
+        h.update(n.encode() + b"\0")
+    h.update(b"\1")
+    for u, v in sorted(set(edges)):
+        h.update(u.encode() + b"\0" + v.encode() + b"\0")
+    return h.hexdigest()[:16]
+
+def cached_layout(db_path: str, nodes: Sequence[str], edges: Sequence[Tuple[str, str]], view: str) -> Positions:
+    """
+    `layered_layout` of the graph, read from / stored in the DB's `layouts`
+    table under (graph_key, view). The DB is never created for it, and a
+    DB without the table or a read-only one just skips the cache.
+    """
+    # sorted input makes the layout a function of the key
+    nodes, edges = sorted(set(nodes)), sorted(set(edges))
+    key, view = graph_key(nodes, edges), f"{view}:v{LAYOUT_VERSION}"
+    if not os.path.exists(db_path):
+        return layered_layout(nodes, edges)
+    try:
+        conn = open_db(db_path)
+    except sqlite3.OperationalError:
+        return layered_layout(nodes, edges)
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='layouts'").fetchone() is None:
+            return layered_layout(nodes, edges)
+        row = conn.execute("SELECT positions FROM layouts WHERE graph_hash=? AND view=?", (key, view)).fetchone()
+        if row is not None:
+            return {n: tuple(xy) for n, xy in json.loads(row[0]).items()}
+        pos = layered_layout(nodes, edges)
+        try:
+            conn.execute("INSERT OR REPLACE INTO layouts(graph_hash, view, positions, created_at) VALUES (?, ?, ?, ?)",
+                         (key, view, json.dumps(pos), time.time()))
+            conn.execute("""DELETE FROM layouts WHERE created_at < (
+                                SELECT created_at FROM layouts ORDER BY created_at DESC LIMIT 1 OFFSET ?)""",
+                         (MAX_CACHED - 1,))
+            conn.commit()
+        except sqlite3.OperationalError:
+            conn.rollback()  # read-only or locked: serve the fresh layout uncached
+        return pos
+    finally:
+        conn.close()
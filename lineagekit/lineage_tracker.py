@@ -1,9 +1,17 @@
-from dataclasses import dataclass, asdict
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass, asdict, fields
 from typing import Literal, Optional, Dict, List, Any
 from enum import Enum
-import time, hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+import itertools, os, time, hashlib, math, threading, uuid, weakref
+from concurrent.futures import ThreadPoolExecutor, Future
+import numpy as np
 import pandas as pd
 
+from .overhead import OverheadRecorder, charge
+
 @dataclass
 class DatasetNode:
     id: str
@@ -19,10 +27,11 @@ class DatasetNode:
 
 @dataclass
 class ColumnNode:
+    __slots__ = ("id", "name", "dataset_id", "dtype", "run_id")
     id: str
     name: str
     dataset_id: str
-    dtype: str
+    dtype: Optional[str]  # None when captured below the schema level
     run_id: str
 
 @dataclass
@@ -37,24 +46,28 @@ class TransformNode:
 
 @dataclass
 class ColToTransformEdge:
+    __slots__ = ("src_col_id", "transform_id", "run_id")
     src_col_id: str
     transform_id: str
     run_id: str
 
 @dataclass
 class TransformToColEdge:
+    __slots__ = ("transform_id", "dest_col_id", "run_id")
     transform_id: str
     dest_col_id: str
     run_id: str
 
 @dataclass
 class DatasetToTransformEdge:
+    __slots__ = ("src_ds_id", "transform_id", "run_id")
     src_ds_id: str
     transform_id: str
     run_id: str
 
 @dataclass
 class TransformToDatasetEdge:
+    __slots__ = ("transform_id", "dest_ds_id", "run_id")
     transform_id: str
     dest_ds_id: str
     run_id: str
@@ -71,6 +84,56 @@ class ColumnStats:
     top: str | None
     top_freq: int | None
     run_id: str
+    sample_rows: int | None = None
+    confidence: float | None = None
+
+@dataclass
+class ProfilePolicy:
+    """
+    How much of a frame `_stats_for` reads.
+
+    - exact: every row (default)
+    - sample: a fixed-size random row sample of `rows` rows
+    - budget: a sample sized so profiling takes roughly `budget_s` seconds
+    """
+    mode: Literal["exact", "sample", "budget"] = "exact"
+    rows: int = 100_000
+    budget_s: float = 0.25
+    probe_rows: int = 1_000
+    seed: int = 7
+
+class CaptureLevel(str, Enum):
+    """
+    How much a decorated call records, cheapest first.
+
+    - off: nothing; the function just runs
+    - structure: dataset/transform/column nodes and edges, without dtypes or stats
+    - schema: structure plus column dtypes
+    - full: schema plus column stats (default)
+    """
+    OFF = "off"
+    STRUCTURE = "structure"
+    SCHEMA = "schema"
+    FULL = "full"
+
+# default capture level of new trackers
+CAPTURE_ENV = "LINEAGEKIT_CAPTURE"
+
+def capture_level(value) -> CaptureLevel:
+    try:
+        return CaptureLevel(str(getattr(value, "value", value)).strip().lower())
+    except ValueError:
+        raise ValueError(f"Unknown capture level {value!r} ({'|'.join(l.value for l in CaptureLevel)})") from None
+
+def _env_capture_level() -> CaptureLevel:
+    raw = os.environ.get(CAPTURE_ENV)
+    if not raw:
+        return CaptureLevel.FULL
+    try:
+        return capture_level(raw)
+    except ValueError:
+        raise ValueError(f"{CAPTURE_ENV}={raw!r} is not a capture level "
+                         f"({'|'.join(l.value for l in CaptureLevel)})") from None
 
 class ChangeType(str, Enum):
     SCHEMA_ADD = "schema_add"
@@ -89,6 +152,36 @@ def _col_id(ds_id: str, col: str):
 def _params_hash(d: Dict[str, Any]):
     return hashlib.sha1(repr(sorted(d.items())).encode()).hexdigest()[:12]
 
+def _register_dataset(dataset_id: str, name: str, kind: str, fmt: Optional[str], path: Optional[str],
+                      code_file: str, code_line: Optional[int], df: pd.DataFrame, rows: Optional[int],
+                      created_at: float) -> DatasetNode:
+    dataset_node = DatasetNode(id=dataset_id,
+                               name=name,
+                               kind=kind,
+                               fmt=fmt,
+                               path=path,
+                               code_file=code_file,
+                               code_line=code_line,
+                               rows=rows,
+                               run_id=tracker.run_id,
+                               created_at=created_at)
+    tracker.insert_dataset(dataset_node)
+    df.attrs["__ds_id__"] = dataset_id
+    cols = [ColumnNode(id=_get_id(dataset_id, col),
+                       name=str(col),
+                       dataset_id=dataset_id,
+                       dtype=dtype,
+                       run_id=tracker.run_id)
+            for col, dtype in zip(df.columns, _dtypes(df))]
+    tracker.insert_columns(cols)
+    return dataset_node
+
+def _dtypes(df: pd.DataFrame):
+    """Column dtype strings of `df` in column order; all None below the schema capture level."""
+    if tracker.capture_level is CaptureLevel.STRUCTURE:
+        return itertools.repeat(None, len(df.columns))
+    return map(str, df.dtypes)
+
 def _ensure_dataset_node_from_df(df: pd.DataFrame, fallback_name: str) -> str:
     ds_id = df.attrs.get("__ds_id__")
     if ds_id:
@@ -103,16 +196,51 @@ def _ensure_dataset_node_from_df(df: pd.DataFrame, fallback_name: str) -> str:
     tracker.insert_dataset(node)
     # register columns
     cols = [ColumnNode(id=_col_id(ds_id, c), dataset_id=ds_id, name=str(c),
-                       dtype=str(df[c].dtype), run_id=tracker.run_id)
-            for c in df.columns]
+                       dtype=dtype, run_id=tracker.run_id)
+            for c, dtype in zip(df.columns, _dtypes(df))]
     tracker.insert_columns(cols)
     df.attrs["__ds_id__"] = ds_id
     return ds_id
 
-def _stats_for(df: pd.DataFrame, ds_id: str):
-    for c in df.columns:
-        s = df[c]
-        if s.dtype.kind in "biufc":
+# numeric columns are converted to float64 blocks of at most this many bytes
+_NUMERIC_BLOCK_BYTES = 1 << 27
+
+def _profile_numeric(frame: pd.DataFrame, idx: List[int], out: list):
+    rows = len(frame)
+    dtypes = frame.dtypes
+    step = max(1, _NUMERIC_BLOCK_BYTES // max(rows * 8, 1))
+    for start in range(0, len(idx), step):
+        part = idx[start:start + step]
+        block = frame.iloc[:, part].to_numpy(dtype="float64", na_value=np.nan)
+        mask = np.isnan(block)
+        nulls = mask.sum(axis=0)
+        has_nulls = bool(nulls.any())
+        if has_nulls:
+            block = np.where(mask, 0.0, block)
+        valid = rows - nulls
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # all-NaN / single-value columns yield NaN, same as pandas
+            means = block.sum(axis=0) / valid if rows else None
+            if rows > 1:
+                centered = block - means
+                if has_nulls:
+                    centered[mask] = 0.0
+                stds = np.sqrt(np.einsum("ij,ij->j", centered, centered) / (valid - 1))
+                stds[valid < 2] = np.nan
+            else:
+                stds = None
+        for j, i in enumerate(part):
+            out[i] = (frame.columns[i], str(dtypes.iloc[i]), int(nulls[j]),
+                      float(means[j]) if means is not None else None,
+                      float(stds[j]) if stds is not None else None,
+                      None, None)
+
+def _profile_other(frame: pd.DataFrame, idx: List[int], out: list):
+    sub = frame.iloc[:, idx]
+    nulls = sub.isna().sum(axis=0).to_numpy()
+    for j, i in enumerate(idx):
+        s = sub.iloc[:, j]
+        if s.dtype.kind == "c":
             mean = float(s.mean()) if s.size else None
             std = float(s.std(ddof=1)) if s.size > 1 else None
             top = top_freq = None
@@ -121,58 +249,522 @@ def _stats_for(df: pd.DataFrame, ds_id: str):
             top = str(vc.index[0]) if len(vc) else None
             top_freq = int(vc.iloc[0]) if len(vc) else None
             mean = std = None
-        tracker.column_stats.append(ColumnStats(dataset_id=ds_id, column=c, dtype=str(s.dtype),
-                                                count=int(s.size), nulls=int(s.isna().sum()),
-                                                mean=mean, std=std, top=top, top_freq=top_freq,
-                                                run_id=tracker.run_id))
+        out[i] = (frame.columns[i], str(s.dtype), int(nulls[j]), mean, std, top, top_freq)
+
+def _profile(frame: pd.DataFrame):
+    """Per-column (name, dtype, nulls, mean, std, top, top_freq), in column order."""
+    kinds = [dt.kind for dt in frame.dtypes]
+    out: list = [None] * len(kinds)
+    numeric = [i for i, k in enumerate(kinds) if k in "biuf"]
+    other = [i for i, k in enumerate(kinds) if k not in "biuf"]
+    if numeric:
+        _profile_numeric(frame, numeric, out)
+    if other:
+        _profile_other(frame, other, out)
+    return out
+
+def _sample_rows(df: pd.DataFrame, n: int, seed: int) -> pd.DataFrame:
+    idx = np.random.default_rng(seed).choice(len(df), size=n, replace=False)
+    idx.sort()
+    return df.take(idx)
+
+def _sample_size(df: pd.DataFrame, policy: ProfilePolicy) -> int:
+    total = len(df)
+    if policy.mode == "sample":
+        return min(total, max(policy.rows, 1))
+    if policy.mode == "budget":
+        probe = min(total, max(policy.probe_rows, 1))
+        if probe >= total:
+            return total
+        t0 = time.perf_counter()
+        _profile(_sample_rows(df, probe, policy.seed))
+        per_row = (time.perf_counter() - t0) / probe
+        return min(total, max(probe, int(policy.budget_s / per_row) if per_row > 0 else total))
+    return total
+
+def _confidence(n: int, total: int) -> float:
+    # 1 - standard-error factor of an n-row sample without replacement
+    if n >= total:
+        return 1.0
+    return max(0.0, 1.0 - math.sqrt((1.0 - n / total) / n))
+
+def _compute_stats(df: pd.DataFrame, ds_id: str, policy: ProfilePolicy, run_id: str) -> List[ColumnStats]:
+    total = len(df)
+    n = _sample_size(df, policy)
+    frame = df if n >= total else _sample_rows(df, n, policy.seed)
+    scale = total / n if n else 1.0
+    confidence = _confidence(n, total)
+    out = []
+    for c, dtype, nulls, mean, std, top, top_freq in _profile(frame):
+        if n < total:
+            nulls = int(round(nulls * scale))
+            top_freq = int(round(top_freq * scale)) if top_freq is not None else None
+        out.append(ColumnStats(dataset_id=ds_id, column=c, dtype=dtype,
+                               count=total, nulls=nulls,
+                               mean=mean, std=std, top=top, top_freq=top_freq,
+                               run_id=run_id,
+                               sample_rows=n, confidence=confidence))
+    return out
+
+def _stats_for(df: pd.DataFrame, ds_id: str, policy: Optional[ProfilePolicy] = None):
+    if tracker.capture_level is not CaptureLevel.FULL:
+        return
+    policy = policy or tracker.profiling
+    with charge("stats"):
+        if tracker.profiler is not None:
+            tracker.profiler.submit(df, ds_id, policy)
+        else:
+            tracker.add_column_stats(_compute_stats(df, ds_id, policy, tracker.run_id))
+
+class BackgroundProfiler:
+    """
+    Computes column stats on a thread pool so decorated calls return without
+    waiting for profiling. At most `max_pending` frames are held at once;
+    further submits block until a slot frees up. `flush()` waits for all
+    pending work and re-raises the first profiling error.
+    """
+
+    def __init__(self, owner: "LineageTracker", max_workers: int = 2, max_pending: int = 8,
+                 deep_copy: bool = False):
+        self.owner = owner
+        # shallow copies freeze the column set; deep copies also guard against in-place value edits
+        self.deep_copy = deep_copy
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lineagekit-stats")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending: set = set()
+        self._errors: List[BaseException] = []
+
+    def submit(self, df: pd.DataFrame, ds_id: str, policy: ProfilePolicy):
+        snapshot = df.copy(deep=self.deep_copy)
+        run_id = self.owner.run_id
+        self._slots.acquire()
+        try:
+            fut = self._pool.submit(_compute_stats, snapshot, ds_id, policy, run_id)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(fut)
+        fut.add_done_callback(self._done)
+
+    def _done(self, fut: Future):
+        try:
+            if fut.exception() is not None:
+                with self._lock:
+                    self._errors.append(fut.exception())
+            else:
+                self.owner.add_column_stats(fut.result())
+        finally:
+            with self._lock:
+                self._pending.discard(fut)
+            self._slots.release()
+
+    def flush(self):
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                break
+            for fut in pending:
+                try:
+                    fut.result()
+                except BaseException:
+                    pass  # recorded by _done
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    def shutdown(self):
+        try:
+            self.flush()
+        finally:
+            self._pool.shutdown(wait=True)
+
+# row kinds a tracker holds, keyed like `rows()` / `drain()`
+_ROW_KINDS = ("datasets", "columns", "transforms", "dataset_to_transform", "transform_to_dataset",
+              "col_to_transform", "transform_to_col", "column_stats")
+_KEYED = {"datasets", "transforms"}  # dicts by node id (last insert wins)
+# high-volume kinds held as interned string codes (_Table); column_stats stays a list
+_COMPACT = {"columns": ColumnNode, "dataset_to_transform": DatasetToTransformEdge,
+            "transform_to_dataset": TransformToDatasetEdge, "col_to_transform": ColToTransformEdge,
+            "transform_to_col": TransformToColEdge}
+# a thread compacts its own buffer once it holds this many rows
+_COMPACT_EVERY = 4096
+
+class _Strings:
+    """Interning pool: each distinct id/name/dtype string is stored once and referenced by an int code."""
+    __slots__ = ("codes", "values")
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = list(values or [])
+        self.codes: Dict[str, int] = {s: i for i, s in enumerate(self.values)}
+
+    def code(self, s: str) -> int:
+        c = self.codes.get(s)
+        if c is None:
+            c = self.codes[s] = len(self.values)
+            self.values.append(s)
+        return c
+
+class _Table:
+    """Append-only columnar rows of one dataclass: an int32 array of string codes per field."""
+    __slots__ = ("cls", "fields", "cols")
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.fields = tuple(f.name for f in fields(cls))
+        self.cols = [array("i") for _ in self.fields]
+
+    def __len__(self):
+        return len(self.cols[0])
+
+    def extend(self, strings: _Strings, items: list):
+        code = strings.code
+        for name, col in zip(self.fields, self.cols):
+            col.extend([code(getattr(x, name)) for x in items])
+
+class _TableView(Sequence):
+    """
+    Read-only snapshot of the first `n` rows of a _Table. Indexing and
+    iteration build the dataclasses on demand; `tuples`/`unique` decode
+    straight from the codes for persistence and export.
+    """
+    __slots__ = ("table", "strings", "n")
+
+    def __init__(self, table: _Table, strings: _Strings, n: int):
+        self.table, self.strings, self.n = table, strings, n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.n))]
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        values = self.strings.values
+        return self.table.cls(*[values[col[i]] for col in self.table.cols])
+
+    def __iter__(self):
+        values, cls = self.strings.values, self.table.cls
+        for codes in itertools.islice(zip(*self.table.cols), self.n):
+            yield cls(*[values[c] for c in codes])
+
+    def codes(self, names=None) -> np.ndarray:
+        """[rows, fields] int codes (copied: the table may still grow)."""
+        idx = [self.table.fields.index(f) for f in names] if names else range(len(self.table.fields))
+        out = np.empty((self.n, len(idx)), dtype=np.intc)
+        for j, i in enumerate(idx):
+            out[:, j] = np.frombuffer(self.table.cols[i][:self.n], dtype=np.intc)
+        return out
+
+    def _decode(self, codes: np.ndarray) -> List[tuple]:
+        get = self.strings.values.__getitem__
+        return list(zip(*[map(get, codes[:, j].tolist()) for j in range(codes.shape[1])]))
+
+    def tuples(self, names=None) -> List[tuple]:
+        return self._decode(self.codes(names))
+
+    def unique(self, names, key: Optional[str] = None) -> List[tuple]:
+        """Distinct rows of `names`; with `key`, the last row per key value (like INSERT OR REPLACE)."""
+        if not self.n:
+            return []
+        if key is None:
+            codes = self.codes(names)
+            if codes.shape[1] != 2:
+                return self._decode(np.unique(codes, axis=0))
+            # edges: one int64 per (src, dest) pair sorts far faster than row-wise unique
+            pairs = np.unique((codes[:, 0].astype(np.int64) << 32) | codes[:, 1])
+            return self._decode(np.stack([pairs >> 32, pairs & 0xFFFFFFFF], axis=1))
+        codes = self.codes([key] + list(names))
+        _, first = np.unique(codes[::-1, 0], return_index=True)
+        return self._decode(codes[np.sort(self.n - 1 - first), 1:])
+
+    def __reduce__(self):
+        # ship only the strings this snapshot uses (shards pickle drained rows)
+        codes = self.codes()
+        used, local = np.unique(codes, return_inverse=True)
+        values = self.strings.values
+        return (_restore_view, (self.table.cls, [values[c] for c in used.tolist()],
+                                local.reshape(codes.shape).astype(np.intc)))
+
+def _restore_view(cls, values: List[str], codes: np.ndarray) -> _TableView:
+    table = _Table(cls)
+    for j, col in enumerate(table.cols):
+        col.frombytes(np.ascontiguousarray(codes[:, j]).tobytes())
+    return _TableView(table, _Strings(values), len(codes))
+
+def _empty_store() -> Dict[str, Any]:
+    return {k: {} if k in _KEYED else _Table(_COMPACT[k]) if k in _COMPACT else [] for k in _ROW_KINDS}
+
+class _ThreadBuffer:
+    """Rows one thread appended since the last merge. Its lock is only contended by merges."""
+    __slots__ = ("lock", "rows", "n", "thread")
 
-class LineageTracker:
     def __init__(self):
-        self.run_id = f"run_{int(time.time())}"
-        self.datasets: Dict[str, DatasetNode] = {}
-        self.transforms: Dict[str, TransformNode] = {}
-        self.columns: List[ColumnNode] = []
-        self.col_to_transform: List[ColToTransformEdge] = []
-        self.transform_to_col: List[TransformToColEdge] = []
-        self.dataset_to_transform: List[DatasetToTransformEdge] = []
-        self.transform_to_dataset: List[TransformToDatasetEdge] = []
-        self.column_stats: List[ColumnStats] = []
+        self.lock = threading.Lock()
+        self.rows: Dict[str, list] = {k: [] for k in _ROW_KINDS}
+        self.n = 0
+        self.thread = weakref.ref(threading.current_thread())
+
+def _merged_view(kind: str):
+    # public attributes read through here, so appends buffered by other threads are visible
+    def get(self):
+        with self._merge_lock:
+            self._merge_locked()
+            table = self._store[kind]
+            return _TableView(table, self._strings, len(table)) if kind in _COMPACT else table
+    return property(get)
+
+class LineageTracker:
+    """
+    Lineage of one run. Inserts go to per-thread append buffers and are
+    merged into the run's nodes/edges/stats whenever they are read (`rows`,
+    `drain`, the attributes below), so threads of one pipeline never contend
+    on a shared list. Columns and edges are kept as interned int codes
+    (a few bytes per row) and read back as `_TableView`s of the dataclasses.
+    How much decorated calls record is set by `capture_level` (`CaptureLevel`,
+    default from the LINEAGEKIT_CAPTURE environment variable).
+    """
+
+    datasets = _merged_view("datasets")
+    columns = _merged_view("columns")
+    transforms = _merged_view("transforms")
+    dataset_to_transform = _merged_view("dataset_to_transform")
+    transform_to_dataset = _merged_view("transform_to_dataset")
+    col_to_transform = _merged_view("col_to_transform")
+    transform_to_col = _merged_view("transform_to_col")
+    column_stats = _merged_view("column_stats")
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or f"run_{int(time.time())}"
+        self._store: Dict[str, Any] = _empty_store()
+        self._strings = _Strings()
+        self._stored = 0
+        self._local = threading.local()
+        self._buffers: List[_ThreadBuffer] = []
+        self._merge_lock = threading.Lock()
+        self.profiling = ProfilePolicy()
+        self._capture_level: Optional[CaptureLevel] = None  # from LINEAGEKIT_CAPTURE on first use
+        self.overhead = OverheadRecorder()  # lineagekit's own time per decorated function
+        self.profiler: Optional[BackgroundProfiler] = None
+        self.writer: Optional[Any] = None  # store.StreamingWriter while streaming
+        self._streams: set = set()  # chunked.ChunkStream objects not yet finished
+        self._streams_lock = threading.Lock()
+
+    @property
+    def capture_level(self) -> CaptureLevel:
+        if self._capture_level is None:
+            # read lazily so a bad value fails the run that uses it, not `import lineagekit`
+            self._capture_level = _env_capture_level()
+        return self._capture_level
+
+    @capture_level.setter
+    def capture_level(self, value):
+        self._capture_level = capture_level(value)
+
+    def enable_async_profiling(self, max_workers: int = 2, max_pending: int = 8, deep_copy: bool = False):
+        self.disable_async_profiling()
+        self.profiler = BackgroundProfiler(self, max_workers=max_workers, max_pending=max_pending,
+                                           deep_copy=deep_copy)
+
+    def disable_async_profiling(self):
+        profiler, self.profiler = self.profiler, None
+        if profiler is not None:
+            profiler.shutdown()
+
+    def flush(self):
+        """Wait for background work (pending column stats) to land on the tracker."""
+        if self.profiler is not None:
+            self.profiler.flush()
+
+    def track_stream(self, stream):
+        with self._streams_lock:
+            self._streams.add(stream)
+
+    def untrack_stream(self, stream):
+        with self._streams_lock:
+            self._streams.discard(stream)
+
+    def finish_streams(self):
+        """Record stats for chunk streams that were abandoned before exhaustion."""
+        with self._streams_lock:
+            streams = list(self._streams)
+        for stream in streams:
+            stream.finish()
+
+    def _buffer(self) -> _ThreadBuffer:
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = self._local.buf = _ThreadBuffer()
+            with self._merge_lock:
+                self._buffers.append(buf)
+        return buf
+
+    def _append(self, kind: str, items: list):
+        buf = self._buffer()
+        with buf.lock:
+            buf.rows[kind].extend(items)
+            buf.n += len(items)
+            full = buf.n >= _COMPACT_EVERY
+        if full:
+            # don't let a long run pile up as dataclasses until the next read
+            with self._merge_lock:
+                self._merge_buffer_locked(buf)
+
+    def _merge_buffer_locked(self, buf: _ThreadBuffer):
+        with buf.lock:
+            rows, n = buf.rows, buf.n
+            if not n:
+                return
+            buf.rows, buf.n = {k: [] for k in _ROW_KINDS}, 0
+        for kind, items in rows.items():
+            if not items:
+                continue
+            if kind in _KEYED:
+                self._store[kind].update((node.id, node) for node in items)
+            elif kind in _COMPACT:
+                self._store[kind].extend(self._strings, items)
+            else:
+                self._store[kind].extend(items)
+        self._stored += n
+
+    def _merge_locked(self):
+        # caller holds _merge_lock; buffers of finished threads are dropped once emptied
+        live = []
+        for buf in self._buffers:
+            self._merge_buffer_locked(buf)
+            thread = buf.thread()
+            if thread is not None and thread.is_alive():
+                live.append(buf)
+        self._buffers = live
+
+    def add_column_stats(self, stats: List[ColumnStats]):
+        self._append("column_stats", stats)
+
+    def _inserted(self):
+        if self.writer is not None:
+            self.writer.maybe_flush()
 
     def insert_dataset(self, node: DatasetNode):
-        self.datasets[node.id] = node
+        self._append("datasets", [node])
+        self._inserted()
 
     def insert_columns(self, cols: List[ColumnNode]):
-        self.columns.extend(cols)
+        self._append("columns", cols)
+        self._inserted()
 
     def insert_transform(self, node: TransformNode):
-        self.transforms[node.id] = node
+        self._append("transforms", [node])
+        self._inserted()
 
     def insert_col_to_transform(self, e: List[ColToTransformEdge]):
-        self.col_to_transform.extend(e)
+        self._append("col_to_transform", e)
+        self._inserted()
 
     def insert_transform_to_col(self, e: List[TransformToColEdge]):
-        self.transform_to_col.extend(e)
+        self._append("transform_to_col", e)
+        self._inserted()
 
     def insert_dataset_to_transform(self, e: List[DatasetToTransformEdge]):
-        self.dataset_to_transform.extend(e)
+        self._append("dataset_to_transform", e)
+        self._inserted()
 
     def insert_transform_to_dataset(self, e: List[TransformToDatasetEdge]):
-        self.transform_to_dataset.extend(e)
+        self._append("transform_to_dataset", e)
+        self._inserted()
+
+    def _snapshot_locked(self) -> Dict[str, Any]:
+        # compact kinds snapshot as views over the current length; tables only ever grow
+        return {k: list(v.values()) if k in _KEYED else _TableView(v, self._strings, len(v)) if k in _COMPACT
+                else list(v) for k, v in self._store.items()}
+
+    def rows(self) -> Dict[str, list]:
+        """Everything currently held, keyed like `drain()`."""
+        with self._merge_lock:
+            self._merge_locked()
+            return self._snapshot_locked()
+
+    def pending_rows(self) -> int:
+        # upper bound (keyed re-inserts count twice); no merge, this runs on every insert while streaming
+        return self._stored + sum(buf.n for buf in self._buffers)
+
+    def drain(self) -> Dict[str, list]:
+        """Hand over everything recorded so far and start empty (used by streaming writers)."""
+        with self._merge_lock:
+            self._merge_locked()
+            rows = self._snapshot_locked()
+            # drained views keep the old tables and string pool; a new pool keeps a streamed run's memory bounded
+            self._store = _empty_store()
+            self._strings = _Strings()
+            self._stored = 0
+        return rows
 
     def export_json(self) -> Dict[str, Any]:
+        rows = self.rows()
+
+        def records(kind):
+            view = rows[kind]
+            return [dict(zip(view.table.fields, t)) for t in view.tuples()]
         return {
             "run_id": self.run_id,
             "nodes": {
-                "datasets": [asdict(d) for d in self.datasets.values()],
-                "columns": [asdict(c) for c in self.columns],
-                "transforms": [asdict(t) for t in self.transforms.values()],
+                "datasets": [asdict(d) for d in rows["datasets"]],
+                "columns": records("columns"),
+                "transforms": [asdict(t) for t in rows["transforms"]],
             },
             "edges": {
-                "dataset_to_transform": [asdict(e) for e in self.dataset_to_transform],
-                "transform_to_dataset": [asdict(e) for e in self.transform_to_dataset],
-                "column_to_transform": [asdict(e) for e in self.col_to_transform],
-                "transform_to_column": [asdict(e) for e in self.transform_to_col],
+                "dataset_to_transform": records("dataset_to_transform"),
+                "transform_to_dataset": records("transform_to_dataset"),
+                "column_to_transform": records("col_to_transform"),
+                "transform_to_column": records("transform_to_col"),
             },
         }
 
-tracker = LineageTracker()
\ No newline at end of file
+_default_tracker = LineageTracker()
+_current: ContextVar[LineageTracker] = ContextVar("lineagekit_tracker")
+
+def current_tracker() -> LineageTracker:
+    """The tracker of the innermost `run_scope` in this context, else the process-wide one."""
+    return _current.get(_default_tracker)
+
+class _TrackerProxy:
+    """
+    `tracker`: forwards every attribute to `current_tracker()`, so decorators
+    and persistence always act on the run of the calling context.
+    """
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        return getattr(current_tracker(), name)
+
+    def __setattr__(self, name, value):
+        setattr(current_tracker(), name, value)
+
+    def __repr__(self):
+        return f"<lineagekit tracker proxy for {current_tracker().run_id}>"
+
+tracker = _TrackerProxy()
+
+@contextmanager
+def run_scope(run_id: Optional[str] = None):
+    """
+    Record everything in this context into a fresh tracker (and run id).
+    asyncio tasks created inside inherit the scope; plain threads start
+    outside it, so hand them work via `contextvars.copy_context().run` or
+    `asyncio.to_thread`.
+    """
+    parent = current_tracker()
+    scoped = LineageTracker(run_id or f"run_{int(time.time())}_{uuid.uuid4().hex[:8]}")
+    scoped.profiling = parent.profiling
+    scoped.capture_level = parent.capture_level
+    token = _current.set(scoped)
+    try:
+        yield scoped
+    finally:
+        _current.reset(token)
+        scoped.disable_async_profiling()
@@ -0,0 +1,153 @@
+"""
+Self-instrumentation: the wall time lineage capture adds to each decorated
+function, per run. A decorated call splits into the user function and
+capture work: column stats, AST analysis and graph (node/edge construction
+and the rest of the wrapper). Capture that happens inside the user function
+(nested decorated calls, chunk streams profiled as the function reads them)
+is not counted as user time; it is charged to the innermost call, or to the
+function that created the stream when none is running.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import threading, time
+
+_clock = time.perf_counter
+_local = threading.local()
+
+@dataclass
+class CallCost:
+    kind: str
+    calls: int = 0
+    user_s: float = 0.0
+    stats_s: float = 0.0
+    ast_s: float = 0.0
+    graph_s: float = 0.0
+
+class OverheadRecorder:
+    """Per-run totals by decorated function (`module.qualname`, or `sklearn:<name>` for the helpers)."""
+
+    def __init__(self):
+        self.costs: Dict[str, CallCost] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, kind: str, calls: int = 0, user: float = 0.0, stats: float = 0.0, ast: float = 0.0,
+            graph: float = 0.0):
+        with self._lock:
+            cost = self.costs.get(key)
+            if cost is None:
+                cost = self.costs[key] = CallCost(kind)
+            cost.calls += calls
+            cost.user_s += user
+            cost.stats_s += stats
+            cost.ast_s += ast
+            cost.graph_s += graph
+
+    def rows(self) -> List[tuple]:
+        """(func, kind, calls, user_s, stats_s, ast_s, graph_s)"""
+        with self._lock:
+            return [(key, c.kind, c.calls, c.user_s, c.stats_s, c.ast_s, c.graph_s) for key, c in self.costs.items()]
+
+def _stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+class timed_call:
+    """
+    Times one decorated call into `recorder`:
+
+        with timed_call(tracker.overhead, key, "transform") as call:
+            out = call.user(func, *args, **kwargs)
+            ...capture...
+    """
+    __slots__ = ("recorder", "key", "kind", "t0", "user_s", "in_user", "hidden", "nested", "stats", "ast")
+
+    def __init__(self, recorder: OverheadRecorder, key: str, kind: str):
+        self.recorder, self.key, self.kind = recorder, key, kind
+        self.user_s = self.hidden = self.nested = self.stats = self.ast = 0.0
+        self.in_user = False
+
+    def __enter__(self) -> "timed_call":
+        _stack().append(self)
+        self.t0 = _clock()
+        return self
+
+    def user(self, func, *args, **kwargs):
+        self.in_user = True
+        t0 = _clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.user_s += _clock() - t0
+            self.in_user = False
+
+    def __exit__(self, *exc):
+        total = _clock() - self.t0
+        stack = _stack()
+        stack.pop()
+        # hidden: capture seconds spent inside the user function; nested: capture of inner decorated calls
+        user = max(self.user_s - self.hidden, 0.0)
+        capture = total - user
+        graph = max(capture - self.nested - self.stats - self.ast, 0.0)
+        self.recorder.add(self.key, self.kind, 1, user, self.stats, self.ast, graph)
+        if stack:
+            parent = stack[-1]
+            parent.nested += capture
+            if parent.in_user:
+                parent.hidden += capture
+        return False
+
+def current_call() -> Optional[timed_call]:
+    """The innermost decorated call running in this thread, if any."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+class charge:
+    """
+    `with charge("stats"):` books the block's time as stats/ast/graph of the
+    innermost decorated call, or of `fallback` (a finished `timed_call`)
+    when none is running. Nested charges book only their own exclusive time.
+    """
+    __slots__ = ("part", "fallback", "t0", "outer_inner")
+
+    def __init__(self, part: str, fallback: Optional[timed_call] = None):
+        self.part, self.fallback = part, fallback
+
+    def __enter__(self):
+        self.outer_inner = getattr(_local, "inner", 0.0)
+        _local.inner = 0.0
+        self.t0 = _clock()
+        return self
+
+    def __exit__(self, *exc):
+        dt = _clock() - self.t0
+        own = dt - _local.inner
+        _local.inner = self.outer_inner + dt
+        call = current_call()
+        if call is not None:
+            if self.part != "graph":  # graph is what remains of the call's capture time
+                setattr(call, self.part, getattr(call, self.part) + own)
+            if call.in_user:
+                call.hidden += own
+        elif self.fallback is not None:
+            self.fallback.recorder.add(self.fallback.key, self.fallback.kind, **{self.part: own})
+        return False
+
+def overhead_report(db_path: str, run_id: Optional[str] = None, top: int = 20) -> List[Dict]:
+    """Decorated functions of a run (latest when omitted), most capture time first."""
+    from .store import latest_run_id, open_db
+    conn = open_db(db_path)
+    try:
+        run_id = run_id or latest_run_id(conn)
+        cur = conn.execute("""
+            SELECT func, kind, calls, user_s, stats_s + ast_s + graph_s AS capture_s, stats_s, ast_s, graph_s
+            FROM call_overhead WHERE run_id = ? ORDER BY capture_s DESC, func LIMIT ?""", (run_id, top))
+        names = [c[0] for c in cur.description]
+        rows = [dict(zip(names, r)) for r in cur.fetchall()]
+    finally:
+        conn.close()
+    for r in rows:
+        spent = r["user_s"] + r["capture_s"]
+        r["overhead_pct"] = 100.0 * r["capture_s"] / spent if spent else 0.0
+    return rows
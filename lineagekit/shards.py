@@ -0,0 +1,178 @@
+"""
+Lineage capture in worker processes. The tracker is per process, so workers
+record into their own tracker and spill it as a shard (a pickle file in a
+directory, or a message on a multiprocessing queue); the parent merges the
+shards into its tracker before `persist_current_run`:
+
+    with ProcessPoolExecutor(initializer=init_worker, initargs=(shard_dir, tracker.run_id)) as ex:
+        parts = list(ex.map(clean, partitions))
+    merge_shards(shard_dir)
+    persist_current_run("lineage.db")
+
+With a queue, each worker also posts a marker when it starts and another
+after its exit spill, and `merge_shards` waits until every worker that
+started is done, so spills still in flight are not lost.
+"""
+from dataclasses import replace
+from multiprocessing import util
+from typing import Any, Dict, Iterable, List, Optional
+import glob, itertools, os, pickle, queue, tempfile, time
+
+from .chunked import PartialStats
+from .lineage_tracker import tracker, ColumnStats, LineageTracker
+
+_target: Any = None   # shard directory or queue of this worker
+_seq = itertools.count()
+
+# identity of each row kind; rows sharing a key are one node/edge
+_KEYS = {
+    "datasets": lambda d: d.id,
+    "columns": lambda c: c.id,
+    "transforms": lambda t: t.id,
+    "dataset_to_transform": lambda e: (e.src_ds_id, e.transform_id),
+    "transform_to_dataset": lambda e: (e.transform_id, e.dest_ds_id),
+    "col_to_transform": lambda e: (e.src_col_id, e.transform_id),
+    "transform_to_col": lambda e: (e.transform_id, e.dest_col_id),
+}
+
+def init_worker(target, run_id: str, capture: Optional[str] = None):
+    """
+    Process-pool initializer: record lineage for `run_id` and spill it to
+    `target` (directory path or queue) when the worker exits. `capture`
+    sets the worker's capture level; spawned workers otherwise take it
+    from LINEAGEKIT_CAPTURE, forked ones from the parent.
+    """
+    global _target
+    _target = target
+    # state inherited through fork belongs to the parent
+    tracker.profiler = None
+    tracker.writer = None
+    tracker._streams.clear()
+    tracker.drain()
+    tracker.run_id = run_id
+    if capture:
+        tracker.capture_level = capture
+    if not isinstance(target, (str, os.PathLike)):
+        target.put({"pid": os.getpid(), "worker": "started"})
+    util.Finalize(None, _spill_at_exit, exitpriority=10)
+
+def _spill_at_exit():
+    spill()
+    if not isinstance(_target, (str, os.PathLike)):
+        _target.put({"pid": os.getpid(), "worker": "done"})
+
+def spill() -> Optional[str]:
+    """
+    Hand everything this process recorded since the last spill to the shard
+    target. Call it at the end of a task for per-task shards; workers set up
+    by `init_worker` also spill on exit. Returns the shard path for directories.
+    """
+    if _target is None:
+        raise RuntimeError("spill() needs a worker set up by init_worker()")
+    tracker.finish_streams()
+    tracker.flush()
+    rows = tracker.drain()
+    if not any(rows.values()):
+        return None
+    payload = {"pid": os.getpid(), "run_id": tracker.run_id, "rows": rows}
+    if not isinstance(_target, (str, os.PathLike)):
+        _target.put(payload)
+        return None
+    os.makedirs(_target, exist_ok=True)
+    path = os.path.join(_target, f"shard-{os.getpid()}-{next(_seq)}.pkl")
+    fd, tmp = tempfile.mkstemp(dir=_target, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+def _read_queue(source, timeout: float) -> List[dict]:
+    # drain, then block while a worker that started has not posted its exit marker
+    shards, running = [], set()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            msg = source.get_nowait() if not running else source.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            if not running:
+                return shards
+            raise TimeoutError(f"{len(running)} worker(s) did not finish spilling within {timeout:g}s "
+                               f"(pids {sorted(running)}); was the pool shut down?") from None
+        state = msg.get("worker")
+        if state == "started":
+            running.add(msg["pid"])
+        elif state == "done":
+            running.discard(msg["pid"])
+        else:
+            shards.append(msg)
+
+def _read_shards(source, remove: bool, timeout: float) -> List[dict]:
+    if not isinstance(source, (str, os.PathLike)):
+        return _read_queue(source, timeout)
+    paths = sorted(glob.glob(os.path.join(source, "shard-*.pkl")))
+    shards = []
+    for path in paths:
+        with open(path, "rb") as f:
+            shards.append(pickle.load(f))
+    if remove:
+        for path in paths:
+            os.remove(path)
+    return shards
+
+def _pool_stats(stats: Iterable[ColumnStats], run_id: str) -> Dict[tuple, ColumnStats]:
+    parts: Dict[tuple, list] = {}
+    for s in stats:
+        n = max((s.count or 0) - (s.nulls or 0), 0)
+        p = PartialStats(dtype=s.dtype, rows=s.count or 0, nulls=s.nulls or 0, numeric=s.mean is not None,
+                         n=n if s.mean is not None and s.mean == s.mean else 0,
+                         mean=s.mean if s.mean is not None and s.mean == s.mean else 0.0,
+                         m2=s.std * s.std * (n - 1) if s.std is not None and s.std == s.std and n > 1 else 0.0)
+        if s.top is not None:
+            p.top[s.top] = s.top_freq or 0
+        key = (s.dataset_id, s.column)
+        if key in parts:
+            parts[key][0].merge(p)
+            parts[key][1] += s.sample_rows if s.sample_rows is not None else s.count or 0
+        else:
+            parts[key] = [p, s.sample_rows if s.sample_rows is not None else s.count or 0]
+    return {key: p.to_column_stats(key[0], key[1], run_id, sampled) for key, (p, sampled) in parts.items()}
+
+def merge_rows(shard_rows: Iterable[Dict[str, list]], into: LineageTracker = tracker):
+    """
+    Merge drained tracker rows into `into`. Nodes and edges are deduped by
+    id (last shard wins); column stats recorded for the same column in
+    several shards are treated as partitions of one dataset and pooled
+    (counts summed, pooled mean/variance, most frequent top value), and
+    that dataset's row count becomes the pooled count.
+    """
+    merged: Dict[str, dict] = {kind: {} for kind in _KEYS}
+    stats: List[ColumnStats] = []
+    for rows in shard_rows:
+        for kind, key in _KEYS.items():
+            for r in rows[kind]:
+                merged[kind][key(r)] = r
+        stats.extend(rows["column_stats"])
+
+    pooled = _pool_stats(stats, into.run_id)
+    counts = {ds_id: s.count for (ds_id, _), s in pooled.items()}
+    for ds_id, node in merged["datasets"].items():
+        into.insert_dataset(replace(node, run_id=into.run_id, rows=counts.get(ds_id, node.rows)))
+    into.insert_columns([replace(c, run_id=into.run_id) for c in merged["columns"].values()])
+    for node in merged["transforms"].values():
+        into.insert_transform(replace(node, run_id=into.run_id))
+    into.insert_dataset_to_transform([replace(e, run_id=into.run_id) for e in merged["dataset_to_transform"].values()])
+    into.insert_transform_to_dataset([replace(e, run_id=into.run_id) for e in merged["transform_to_dataset"].values()])
+    into.insert_col_to_transform([replace(e, run_id=into.run_id) for e in merged["col_to_transform"].values()])
+    into.insert_transform_to_col([replace(e, run_id=into.run_id) for e in merged["transform_to_col"].values()])
+    into.add_column_stats(list(pooled.values()))
+
+def merge_shards(source, into: LineageTracker = tracker, remove: bool = True, timeout: float = 60.0) -> int:
+    """
+    Merge every shard in `source` (directory or queue) into `into`; returns
+    the shard count. A queue is read until every `init_worker` process that
+    started has spilled on exit (`TimeoutError` after `timeout` seconds),
+    so call it once the pool is shut down; a directory is read as it is.
+    """
+    shards = _read_shards(source, remove, timeout)
+    merge_rows((s["rows"] for s in shards), into)
+    return len(shards)
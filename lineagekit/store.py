@@ -1,80 +1,119 @@
 from typing import Any, Dict
-import sqlite3, json
+import sqlite3, json, time, threading, atexit, hashlib
 
-from .lineage_tracker import tracker
+from .lineage_tracker import tracker, current_tracker, capture_level, CaptureLevel
 
-DDL = [
-    """
+# Bump SCHEMA_VERSION and add a MIGRATIONS entry for every schema change.
+# Fresh DBs are created straight from TABLES/INDEXES at the latest version.
+SCHEMA_VERSION = 8
+
+# Graph structure (nodes + edges) is stored once per snapshot, a content hash
+# of the structure; runs point at a snapshot and keep only per-run data
+# (row counts, column_stats, changes).
+STRUCTURE = {
+    "datasets": ["id", "name", "kind", "fmt", "path", "code_file", "code_line"],
+    "columns": ["id", "dataset_id", "name", "dtype"],
+    "transforms": ["id", "name", "code_file", "code_line", "params_hash"],
+    "dataset_to_transform_edges": ["src_dataset_id", "transform_id"],
+    "transform_to_dataset_edges": ["transform_id", "dest_dataset_id"],
+    "column_to_transform_edges": ["src_col_id", "transform_id"],
+    "transform_to_column_edges": ["transform_id", "dest_col_id"],
+}
+
+TABLES = {
+    "runs": """
     CREATE TABLE IF NOT EXISTS runs (
         run_id TEXT PRIMARY KEY,
+        created_at REAL,
+        snapshot_id TEXT,
+        capture_level TEXT,
+        write_seq INTEGER
+    );
+    """,
+    "snapshots": """
+    CREATE TABLE IF NOT EXISTS snapshots (
+        snapshot_id TEXT PRIMARY KEY,
         created_at REAL
     );
     """,
-    """
+    "datasets": """
     CREATE TABLE IF NOT EXISTS datasets (
-        id TEXT PRIMARY KEY,
+        id TEXT NOT NULL,
         name TEXT,
         kind TEXT,
         fmt TEXT,
         path TEXT,
         code_file TEXT,
         code_line INTEGER,
-        rows INTEGER,
-        run_id TEXT
-    );
+        snapshot_id TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, id)
+    ) WITHOUT ROWID;
     """,
-    """
+    "columns": """
     CREATE TABLE IF NOT EXISTS columns (
-        id TEXT PRIMARY KEY,
+        id TEXT NOT NULL,
         dataset_id TEXT,
         name TEXT,
         dtype TEXT,
-        run_id TEXT
-    );
+        snapshot_id TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, id)
+    ) WITHOUT ROWID;
     """,
-    """
+    "transforms": """
     CREATE TABLE IF NOT EXISTS transforms (
-        id TEXT PRIMARY KEY,
+        id TEXT NOT NULL,
         name TEXT,
         code_file TEXT,
         code_line INTEGER,
         params_hash TEXT,
-        run_id TEXT,
-        created_at REAL
-    );
+        snapshot_id TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, id)
+    ) WITHOUT ROWID;
     """,
-    """
+    "dataset_to_transform_edges": """
     CREATE TABLE IF NOT EXISTS dataset_to_transform_edges (
-        src_dataset_id TEXT,
-        transform_id TEXT,
-        run_id TEXT
-    );
+        src_dataset_id TEXT NOT NULL,
+        transform_id TEXT NOT NULL,
+        snapshot_id TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, src_dataset_id, transform_id)
+    ) WITHOUT ROWID;
     """,
-    """
+    "transform_to_dataset_edges": """
     CREATE TABLE IF NOT EXISTS transform_to_dataset_edges (
-        transform_id TEXT,
-        dest_dataset_id TEXT,
-        run_id TEXT
-    );
+        transform_id TEXT NOT NULL,
+        dest_dataset_id TEXT NOT NULL,
+        snapshot_id TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, transform_id, dest_dataset_id)
+    ) WITHOUT ROWID;
     """,
-    """
+    "column_to_transform_edges": """
     CREATE TABLE IF NOT EXISTS column_to_transform_edges (
-        src_col_id TEXT,
-        transform_id TEXT,
-        run_id TEXT
-    );
+        src_col_id TEXT NOT NULL,
+        transform_id TEXT NOT NULL,
+        snapshot_id TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, src_col_id, transform_id)
+    ) WITHOUT ROWID;
     """,
-    """
+    "transform_to_column_edges": """
     CREATE TABLE IF NOT EXISTS transform_to_column_edges (
-        transform_id TEXT,
-        dest_col_id TEXT,
-        run_id TEXT
-    );
+        transform_id TEXT NOT NULL,
+        dest_col_id TEXT NOT NULL,
+        snapshot_id TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, transform_id, dest_col_id)
+    ) WITHOUT ROWID;
     """,
-    """
+    "dataset_rows": """
+    CREATE TABLE IF NOT EXISTS dataset_rows (
+        run_id TEXT NOT NULL,
+        dataset_id TEXT NOT NULL,
+        rows INTEGER,
+        PRIMARY KEY (run_id, dataset_id)
+    ) WITHOUT ROWID;
+    """,
+    "column_stats": """
     CREATE TABLE IF NOT EXISTS column_stats (
-        dataset_id TEXT,
-        column TEXT,
+        dataset_id TEXT NOT NULL,
+        column TEXT NOT NULL,
         dtype TEXT,
         count INTEGER,
         nulls INTEGER,
@@ -82,10 +121,64 @@ DDL = [
         std REAL,
         top TEXT,
         top_freq INTEGER,
-        run_id TEXT
-    );
+        run_id TEXT NOT NULL,
+        sample_rows INTEGER,
+        confidence REAL,
+        PRIMARY KEY (run_id, dataset_id, column)
+    ) WITHOUT ROWID;
     """,
-    """
+    # materialized impact closure (see impact.build_impact_index)
+    "impact_nodes": """
+    CREATE TABLE IF NOT EXISTS impact_nodes (
+        snapshot_id TEXT NOT NULL,
+        ord INTEGER NOT NULL,
+        node_id TEXT,
+        kind TEXT,
+        PRIMARY KEY (snapshot_id, ord)
+    ) WITHOUT ROWID;
+    """,
+    "impact_regimes": """
+    CREATE TABLE IF NOT EXISTS impact_regimes (
+        snapshot_id TEXT NOT NULL,
+        change_type TEXT NOT NULL,
+        regime INTEGER,
+        PRIMARY KEY (snapshot_id, change_type)
+    ) WITHOUT ROWID;
+    """,
+    "impact_index": """
+    CREATE TABLE IF NOT EXISTS impact_index (
+        snapshot_id TEXT NOT NULL,
+        regime INTEGER NOT NULL,
+        origin TEXT NOT NULL,
+        hits BLOB,
+        PRIMARY KEY (snapshot_id, regime, origin)
+    ) WITHOUT ROWID;
+    """,
+    # node positions for drawing, per structural hash of the drawn graph (see layout.cached_layout)
+    "layouts": """
+    CREATE TABLE IF NOT EXISTS layouts (
+        graph_hash TEXT NOT NULL,
+        view TEXT NOT NULL,
+        positions TEXT,
+        created_at REAL,
+        PRIMARY KEY (graph_hash, view)
+    ) WITHOUT ROWID;
+    """,
+    # lineagekit's own wall time per decorated function and run (see overhead.py)
+    "call_overhead": """
+    CREATE TABLE IF NOT EXISTS call_overhead (
+        run_id TEXT NOT NULL,
+        func TEXT NOT NULL,
+        kind TEXT,
+        calls INTEGER,
+        user_s REAL,
+        stats_s REAL,
+        ast_s REAL,
+        graph_s REAL,
+        PRIMARY KEY (run_id, func)
+    ) WITHOUT ROWID;
+    """,
+    "changes": """
     CREATE TABLE IF NOT EXISTS changes (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         run_id TEXT,
@@ -95,124 +188,565 @@ DDL = [
         detail TEXT,
         severity TEXT
     );
-    """
+    """,
+}
+
+# Primary keys above lead with snapshot_id/run_id and cover the forward
+# lookups (impact BFS, exports, UI); these cover reverse lookups and ordering.
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS runs_created_at ON runs(created_at)",
+    "CREATE INDEX IF NOT EXISTS runs_snapshot ON runs(snapshot_id)",
+    "CREATE INDEX IF NOT EXISTS runs_write_seq ON runs(write_seq)",
+    "CREATE INDEX IF NOT EXISTS columns_dataset ON columns(snapshot_id, dataset_id)",
+    "CREATE INDEX IF NOT EXISTS d2t_transform ON dataset_to_transform_edges(snapshot_id, transform_id, src_dataset_id)",
+    "CREATE INDEX IF NOT EXISTS t2d_dataset ON transform_to_dataset_edges(snapshot_id, dest_dataset_id, transform_id)",
+    "CREATE INDEX IF NOT EXISTS c2t_transform ON column_to_transform_edges(snapshot_id, transform_id, src_col_id)",
+    "CREATE INDEX IF NOT EXISTS t2c_column ON transform_to_column_edges(snapshot_id, dest_col_id, transform_id)",
+    "CREATE INDEX IF NOT EXISTS changes_run ON changes(run_id)",
 ]
 
-def init_db(path: str):
-    conn = sqlite3.connect(path)
-    cur = conn.cursor()
-    for statement in DDL:
+DDL = list(TABLES.values()) + INDEXES
+
+def _table_columns(cur: sqlite3.Cursor, table: str):
+    return [r[1] for r in cur.execute(f"PRAGMA table_info({table})")]
+
+def _migrate_1(cur: sqlite3.Cursor):
+    # sampled-profiling columns on column_stats
+    have = set(_table_columns(cur, "column_stats"))
+    for col, typ in [("sample_rows", "INTEGER"), ("confidence", "REAL")]:
+        if col not in have:
+            cur.execute(f"ALTER TABLE column_stats ADD COLUMN {col} {typ}")
+
+def _rebuild_table(cur: sqlite3.Cursor, table: str, create_sql: str, exprs: Dict[str, str] | None = None):
+    """Recreate `table` from `create_sql`, copying shared columns (or `exprs` over the old ones)."""
+    old = f"{table}__old"
+    cur.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    cur.execute(create_sql)
+    old_cols = set(_table_columns(cur, old))
+    exprs = exprs or {}
+    keep = [c for c in _table_columns(cur, table) if c in exprs or c in old_cols]
+    cols = ", ".join(keep)
+    select = ", ".join(exprs.get(c, c) for c in keep)
+    # rows that collide on the new keys (or lack a key column) are dropped
+    cur.execute(f"INSERT OR IGNORE INTO {table}({cols}) SELECT {select} FROM {old}")
+    cur.execute(f"DROP TABLE {old}")
+
+# v2 shapes of the keyed tables, kept verbatim so _migrate_2 stays reproducible
+_V2_KEYED = {
+    "datasets": ("id TEXT NOT NULL, name TEXT, kind TEXT, fmt TEXT, path TEXT, code_file TEXT, "
+                 "code_line INTEGER, rows INTEGER, run_id TEXT NOT NULL", "run_id, id"),
+    "columns": ("id TEXT NOT NULL, dataset_id TEXT, name TEXT, dtype TEXT, run_id TEXT NOT NULL", "run_id, id"),
+    "transforms": ("id TEXT NOT NULL, name TEXT, code_file TEXT, code_line INTEGER, params_hash TEXT, "
+                   "run_id TEXT NOT NULL, created_at REAL", "run_id, id"),
+    "dataset_to_transform_edges": ("src_dataset_id TEXT NOT NULL, transform_id TEXT NOT NULL, run_id TEXT NOT NULL",
+                                   "run_id, src_dataset_id, transform_id"),
+    "transform_to_dataset_edges": ("transform_id TEXT NOT NULL, dest_dataset_id TEXT NOT NULL, run_id TEXT NOT NULL",
+                                   "run_id, transform_id, dest_dataset_id"),
+    "column_to_transform_edges": ("src_col_id TEXT NOT NULL, transform_id TEXT NOT NULL, run_id TEXT NOT NULL",
+                                  "run_id, src_col_id, transform_id"),
+    "transform_to_column_edges": ("transform_id TEXT NOT NULL, dest_col_id TEXT NOT NULL, run_id TEXT NOT NULL",
+                                  "run_id, transform_id, dest_col_id"),
+    "column_stats": ("dataset_id TEXT NOT NULL, column TEXT NOT NULL, dtype TEXT, count INTEGER, nulls INTEGER, "
+                     "mean REAL, std REAL, top TEXT, top_freq INTEGER, run_id TEXT NOT NULL, sample_rows INTEGER, "
+                     "confidence REAL", "run_id, dataset_id, column"),
+}
+
+def _migrate_2(cur: sqlite3.Cursor):
+    # run-scoped composite keys (dedupes edges) + covering indexes
+    for table, (cols, key) in _V2_KEYED.items():
+        _rebuild_table(cur, table, f"CREATE TABLE {table} ({cols}, PRIMARY KEY ({key})) WITHOUT ROWID")
+    for table, cols in [("columns", "dataset_id"),
+                        ("dataset_to_transform_edges", "transform_id, src_dataset_id"),
+                        ("transform_to_dataset_edges", "dest_dataset_id, transform_id"),
+                        ("column_to_transform_edges", "transform_id, src_col_id"),
+                        ("transform_to_column_edges", "dest_col_id, transform_id")]:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {table}_v2 ON {table}(run_id, {cols})")
+    cur.execute("CREATE INDEX IF NOT EXISTS runs_created_at ON runs(created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS changes_run ON changes(run_id)")
+
+# v3 shapes of the structure tables (column DDL, key, hashed fields) and the v3 snapshot hash,
+# kept verbatim so _migrate_3 stays reproducible
+_V3_STRUCTURE = {
+    "datasets": ("id TEXT NOT NULL, name TEXT, kind TEXT, fmt TEXT, path TEXT, code_file TEXT, code_line INTEGER",
+                 "snapshot_id, id", ["id", "name", "kind", "fmt", "path", "code_file", "code_line"]),
+    "columns": ("id TEXT NOT NULL, dataset_id TEXT, name TEXT, dtype TEXT", "snapshot_id, id",
+                ["id", "dataset_id", "name", "dtype"]),
+    "transforms": ("id TEXT NOT NULL, name TEXT, code_file TEXT, code_line INTEGER, params_hash TEXT", "snapshot_id, id",
+                   ["id", "name", "code_file", "code_line", "params_hash"]),
+    "dataset_to_transform_edges": ("src_dataset_id TEXT NOT NULL, transform_id TEXT NOT NULL",
+                                   "snapshot_id, src_dataset_id, transform_id", ["src_dataset_id", "transform_id"]),
+    "transform_to_dataset_edges": ("transform_id TEXT NOT NULL, dest_dataset_id TEXT NOT NULL",
+                                   "snapshot_id, transform_id, dest_dataset_id", ["transform_id", "dest_dataset_id"]),
+    "column_to_transform_edges": ("src_col_id TEXT NOT NULL, transform_id TEXT NOT NULL",
+                                  "snapshot_id, src_col_id, transform_id", ["src_col_id", "transform_id"]),
+    "transform_to_column_edges": ("transform_id TEXT NOT NULL, dest_col_id TEXT NOT NULL",
+                                  "snapshot_id, transform_id, dest_col_id", ["transform_id", "dest_col_id"]),
+}
+_V3_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS runs_created_at ON runs(created_at)",
+    "CREATE INDEX IF NOT EXISTS runs_snapshot ON runs(snapshot_id)",
+    "CREATE INDEX IF NOT EXISTS columns_dataset ON columns(snapshot_id, dataset_id)",
+    "CREATE INDEX IF NOT EXISTS d2t_transform ON dataset_to_transform_edges(snapshot_id, transform_id, src_dataset_id)",
+    "CREATE INDEX IF NOT EXISTS t2d_dataset ON transform_to_dataset_edges(snapshot_id, dest_dataset_id, transform_id)",
+    "CREATE INDEX IF NOT EXISTS c2t_transform ON column_to_transform_edges(snapshot_id, transform_id, src_col_id)",
+    "CREATE INDEX IF NOT EXISTS t2c_column ON transform_to_column_edges(snapshot_id, dest_col_id, transform_id)",
+    "CREATE INDEX IF NOT EXISTS changes_run ON changes(run_id)",
+]
+
+def _v3_finalize(cur: sqlite3.Cursor, staged_id: str):
+    h = hashlib.sha1()
+    for table, (_, _, fields) in _V3_STRUCTURE.items():
+        h.update(table.encode())
+        rows = cur.execute(f"SELECT {', '.join(fields)} FROM {table} WHERE snapshot_id=?", (staged_id,)).fetchall()
+        for r in sorted(repr(tuple(r)) for r in rows):
+            h.update(r.encode())
+    snapshot_id = h.hexdigest()[:16]
+    exists = cur.execute("SELECT 1 FROM snapshots WHERE snapshot_id=?", (snapshot_id,)).fetchone()
+    for table in _V3_STRUCTURE:
+        if exists:
+            cur.execute(f"DELETE FROM {table} WHERE snapshot_id=?", (staged_id,))
+        else:
+            cur.execute(f"UPDATE {table} SET snapshot_id=? WHERE snapshot_id=?", (snapshot_id, staged_id))
+    if not exists:
+        cur.execute("INSERT INTO snapshots(snapshot_id, created_at) VALUES (?, strftime('%s', 'now'))", (snapshot_id,))
+    cur.execute("UPDATE runs SET snapshot_id=? WHERE snapshot_id=?", (snapshot_id, staged_id))
+
+def _migrate_3(cur: sqlite3.Cursor):
+    # content-addressed snapshots: each run's structure moves under a snapshot
+    # (staged as the run_id), then identical structures collapse onto one hash
+    cur.execute("CREATE TABLE IF NOT EXISTS snapshots (snapshot_id TEXT PRIMARY KEY, created_at REAL)")
+    cur.execute("CREATE TABLE IF NOT EXISTS dataset_rows (run_id TEXT NOT NULL, dataset_id TEXT NOT NULL, rows INTEGER, "
+                "PRIMARY KEY (run_id, dataset_id)) WITHOUT ROWID")
+    cur.execute("ALTER TABLE runs ADD COLUMN snapshot_id TEXT")
+    cur.execute("UPDATE runs SET snapshot_id = run_id")
+    cur.execute("INSERT OR IGNORE INTO dataset_rows(run_id, dataset_id, rows) SELECT run_id, id, rows FROM datasets")
+    for table, (cols, key, _) in _V3_STRUCTURE.items():
+        cur.execute(f"DROP INDEX IF EXISTS {table}_v2")
+        _rebuild_table(cur, table, f"CREATE TABLE {table} ({cols}, snapshot_id TEXT NOT NULL, PRIMARY KEY ({key})) "
+                                   "WITHOUT ROWID", {"snapshot_id": "run_id"})
+    for (run_id,) in cur.execute("SELECT run_id FROM runs").fetchall():
+        _v3_finalize(cur, run_id)
+    for statement in _V3_INDEXES:
         cur.execute(statement)
-    conn.commit()
-    return conn
 
-def persist_current_run(db_path: str):
-    conn = init_db(db_path)
+def _migrate_4(cur: sqlite3.Cursor):
+    # materialized impact closure
+    for table in ("impact_nodes", "impact_regimes", "impact_index"):
+        cur.execute(TABLES[table])
+
+def _migrate_5(cur: sqlite3.Cursor):
+    # UI layout cache
+    cur.execute(TABLES["layouts"])
+
+def _migrate_6(cur: sqlite3.Cursor):
+    # capture level per run; NULL for runs recorded before levels existed (they captured everything)
+    if "capture_level" not in _table_columns(cur, "runs"):
+        cur.execute("ALTER TABLE runs ADD COLUMN capture_level TEXT")
+
+def _migrate_7(cur: sqlite3.Cursor):
+    # per-run capture overhead
+    cur.execute(TABLES["call_overhead"])
+
+def _migrate_8(cur: sqlite3.Cursor):
+    # write counter per run: cache tokens can't rely on created_at's 1 s resolution
+    if "write_seq" not in _table_columns(cur, "runs"):
+        cur.execute("ALTER TABLE runs ADD COLUMN write_seq INTEGER")
+    cur.execute("CREATE INDEX IF NOT EXISTS runs_write_seq ON runs(write_seq)")
+
+MIGRATIONS = {1: _migrate_1, 2: _migrate_2, 3: _migrate_3, 4: _migrate_4, 5: _migrate_5, 6: _migrate_6, 7: _migrate_7,
+              8: _migrate_8}
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Upgrade an existing DB in place, one transaction per version. Returns the new version."""
     cur = conn.cursor()
+    while True:
+        # the version is re-read under the write lock: another process may have migrated meanwhile
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn)
+            if version >= SCHEMA_VERSION:
+                conn.commit()
+                return version
+            MIGRATIONS[version + 1](cur)
+            cur.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
-    cur.execute(
-        "INSERT OR REPLACE INTO runs (run_id, created_at) VALUES (?, strftime('%s', 'now'))",
-        (tracker.run_id,)
-    )
+def init_db(path: str, **connect_kwargs):
+    conn = sqlite3.connect(path, **connect_kwargs)
+    if schema_version(conn) == SCHEMA_VERSION:
+        return conn
+    cur = conn.cursor()
+    # DDL autocommits per statement; hold the write lock so concurrent creators see all or nothing
+    cur.execute("BEGIN IMMEDIATE")
+    fresh = cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='runs'").fetchone() is None
+    if fresh:
+        for statement in DDL:
+            cur.execute(statement)
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    else:
+        conn.commit()
+        migrate(conn)
+    return conn
 
-    cur.executemany("""
-        INSERT OR REPLACE INTO datasets(id, name, kind, fmt, path, code_file, code_line, rows, run_id)
-        VALUES (:id, :name, :kind, :fmt, :path, :code_file, :code_line, :rows, :run_id)
-    """, [d.__dict__ for d in tracker.datasets.values()])
+def open_db(path: str, **connect_kwargs):
+    """
+    Connection for reading. A DB written by an older lineagekit is migrated
+    first, as `init_db` does on the write paths; an empty one is left as is.
+    """
+    conn = sqlite3.connect(path, **connect_kwargs)
+    version = schema_version(conn)
+    if version >= SCHEMA_VERSION or conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='runs'").fetchone() is None:
+        return conn
+    conn.close()
+    try:
+        return init_db(path, **connect_kwargs)
+    except sqlite3.OperationalError as e:
+        raise sqlite3.OperationalError(f"{path} has schema v{version} (lineagekit reads v{SCHEMA_VERSION}) and could "
+                                       f"not be upgraded: {e}. Run `lineagekit migrate --db {path}`") from e
 
-    cur.executemany("""
-        INSERT OR REPLACE INTO columns(id, dataset_id, name, dtype, run_id)
-        VALUES (:id, :dataset_id, :name, :dtype, :run_id)
-    """, [c.__dict__ for c in tracker.columns])
+def _structure_rows(rows: Dict[str, list]) -> Dict[str, list]:
+    """Tracker rows -> STRUCTURE tuples, deduped on each table's key like INSERT OR REPLACE would."""
+    def by_id(items, fields):
+        return list({getattr(x, "id"): tuple(getattr(x, f) for f in fields) for x in items}.values())
+    # columns and edges are tracker _TableViews: deduped on their interned codes
+    return {
+        "datasets": by_id(rows["datasets"], ["id", "name", "kind", "fmt", "path", "code_file", "code_line"]),
+        "columns": rows["columns"].unique(["id", "dataset_id", "name", "dtype"], key="id"),
+        "transforms": by_id(rows["transforms"], ["id", "name", "code_file", "code_line", "params_hash"]),
+        "dataset_to_transform_edges": rows["dataset_to_transform"].unique(["src_ds_id", "transform_id"]),
+        "transform_to_dataset_edges": rows["transform_to_dataset"].unique(["transform_id", "dest_ds_id"]),
+        "column_to_transform_edges": rows["col_to_transform"].unique(["src_col_id", "transform_id"]),
+        "transform_to_column_edges": rows["transform_to_col"].unique(["transform_id", "dest_col_id"]),
+    }
 
-    cur.executemany("""
-        INSERT OR REPLACE INTO transforms(id, name, code_file, code_line, params_hash, run_id)
-        VALUES (:id, :name, :code_file, :code_line, :params_hash, :run_id)
-    """, [t.__dict__ for t in tracker.transforms.values()])
+def graph_hash(structure: Dict[str, list]) -> str:
+    """Canonical content hash of a run's graph structure (order-independent)."""
+    h = hashlib.sha1()
+    for table in STRUCTURE:
+        h.update(table.encode())
+        for r in sorted(repr(tuple(r)) for r in structure.get(table, [])):
+            h.update(r.encode())
+    return h.hexdigest()[:16]
 
-    cur.executemany("""
-        INSERT OR REPLACE INTO dataset_to_transform_edges(src_dataset_id, transform_id, run_id)
-        VALUES (?, ?, ?)
-    """, [(e.src_ds_id, e.transform_id, e.run_id) for e in tracker.dataset_to_transform])
+def _write_structure(cur: sqlite3.Cursor, snapshot_id: str, structure: Dict[str, list]):
+    for table, fields in STRUCTURE.items():
+        cols = ", ".join(fields + ["snapshot_id"])
+        marks = ", ".join("?" * (len(fields) + 1))
+        cur.executemany(f"INSERT OR REPLACE INTO {table}({cols}) VALUES ({marks})",
+                        [tuple(r) + (snapshot_id,) for r in structure.get(table, [])])
 
-    cur.executemany("""
-        INSERT OR REPLACE INTO transform_to_dataset_edges(transform_id, dest_dataset_id, run_id)
-        VALUES (?, ?, ?)
-    """, [(e.transform_id, e.dest_ds_id, e.run_id) for e in tracker.transform_to_dataset])
+def _finalize_snapshot(cur: sqlite3.Cursor, staged_id: str) -> str:
+    """Hash structure rows staged under `staged_id`, then share or relabel them."""
+    structure = {
+        table: cur.execute(f"SELECT {', '.join(fields)} FROM {table} WHERE snapshot_id=?", (staged_id,)).fetchall()
+        for table, fields in STRUCTURE.items()
+    }
+    snapshot_id = graph_hash(structure)
+    exists = cur.execute("SELECT 1 FROM snapshots WHERE snapshot_id=?", (snapshot_id,)).fetchone()
+    for table in STRUCTURE:
+        if exists:
+            cur.execute(f"DELETE FROM {table} WHERE snapshot_id=?", (staged_id,))
+        else:
+            cur.execute(f"UPDATE {table} SET snapshot_id=? WHERE snapshot_id=?", (snapshot_id, staged_id))
+    if not exists:
+        cur.execute("INSERT INTO snapshots(snapshot_id, created_at) VALUES (?, strftime('%s', 'now'))", (snapshot_id,))
+    cur.execute("UPDATE runs SET snapshot_id=? WHERE snapshot_id=?", (snapshot_id, staged_id))
+    return snapshot_id
+
+def _bump_write_seq(cur: sqlite3.Cursor, run_id: str):
+    # DB-wide and increasing: writers are serialized by SQLite's write lock
+    cur.execute("UPDATE runs SET write_seq = (SELECT COALESCE(MAX(write_seq), 0) + 1 FROM runs) WHERE run_id=?",
+                (run_id,))
 
+def _write_run_rows(cur: sqlite3.Cursor, run_id: str, rows: Dict[str, list]):
+    _bump_write_seq(cur, run_id)
     cur.executemany("""
-        INSERT OR REPLACE INTO column_to_transform_edges(src_col_id, transform_id, run_id)
-        VALUES (?, ?, ?)
-    """, [(e.src_col_id, e.transform_id, e.run_id) for e in tracker.col_to_transform])
+        INSERT OR REPLACE INTO dataset_rows(run_id, dataset_id, rows) VALUES (?, ?, ?)
+    """, [(run_id, d.id, d.rows) for d in rows["datasets"]])
 
     cur.executemany("""
-        INSERT OR REPLACE INTO transform_to_column_edges(transform_id, dest_col_id, run_id)
-        VALUES (?, ?, ?)
-    """, [(e.transform_id, e.dest_col_id, e.run_id) for e in tracker.transform_to_col])
+        INSERT OR REPLACE INTO column_stats(dataset_id, column, dtype, count, nulls, mean, std, top, top_freq, run_id,
+                                            sample_rows, confidence)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(s.dataset_id, s.column, s.dtype, s.count, s.nulls, s.mean, s.std, s.top, s.top_freq, s.run_id,
+           s.sample_rows, s.confidence)
+      for s in rows["column_stats"]])
 
+def _write_overhead(cur: sqlite3.Cursor, run_id: str, owner):
+    # cumulative per run, so a re-persist just replaces the totals
     cur.executemany("""
-        INSERT OR REPLACE INTO column_stats(dataset_id, column, dtype, count, nulls, mean, std, top, top_freq, run_id)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, [(s.dataset_id, s.column, s.dtype, s.count, s.nulls, s.mean, s.std, s.top, s.top_freq, s.run_id)
-      for s in tracker.column_stats])
+        INSERT OR REPLACE INTO call_overhead(run_id, func, kind, calls, user_s, stats_s, ast_s, graph_s)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(run_id, *r) for r in owner.overhead.rows()])
+
+def _write_run(cur: sqlite3.Cursor, run_id: str, snapshot_id: str, capture: CaptureLevel | str | None = None):
+    cur.execute(
+        "INSERT OR REPLACE INTO runs (run_id, created_at, snapshot_id, capture_level) VALUES (?, strftime('%s', 'now'), ?, ?)",
+        (run_id, snapshot_id, capture_level(capture).value if capture else None)
+    )
+    _bump_write_seq(cur, run_id)
+
+def run_capture_level(conn: sqlite3.Connection, run_id: str) -> CaptureLevel:
+    """What a run captured; runs recorded before capture levels existed count as full."""
+    try:
+        row = conn.execute("SELECT capture_level FROM runs WHERE run_id=?", (run_id,)).fetchone()
+    except sqlite3.OperationalError:
+        return CaptureLevel.FULL  # DB not migrated to v6 yet
+    return capture_level(row[0]) if row and row[0] else CaptureLevel.FULL
+
+def persist_current_run(db_path: str, build_index: bool = False):
+    """
+    Persist the tracker's run. Its graph structure is stored once per
+    distinct `graph_hash`; a re-run with an unchanged topology only adds
+    a runs row, row counts and column stats. With a `StreamingWriter`
+    attached the run is already in its DB and this just closes the writer.
+    `build_index` also materializes the impact index for the snapshot.
+    """
+    tracker.finish_streams()
+    tracker.flush()
+    if tracker.writer is not None:
+        tracker.writer.close()
+    else:
+        _persist_rows(db_path)
+    from .graph_cache import invalidate
+    invalidate(db_path, tracker.run_id)
+    if build_index:
+        from .impact import build_impact_index
+        build_impact_index(db_path, tracker.run_id)
 
+def _persist_rows(db_path: str):
+    rows = tracker.rows()
+    structure = _structure_rows(rows)
+    snapshot_id = graph_hash(structure)
+
+    conn = init_db(db_path)
+    cur = conn.cursor()
+    if not cur.execute("SELECT 1 FROM snapshots WHERE snapshot_id=?", (snapshot_id,)).fetchone():
+        _write_structure(cur, snapshot_id, structure)
+        cur.execute("INSERT INTO snapshots(snapshot_id, created_at) VALUES (?, strftime('%s', 'now'))", (snapshot_id,))
+    _write_run(cur, tracker.run_id, snapshot_id, tracker.capture_level)
+    _write_run_rows(cur, tracker.run_id, rows)
+    _write_overhead(cur, tracker.run_id, current_tracker())
     conn.commit()
     conn.close()
 
-def detect_changes(db_path: str, base_run: str, curr_run: str, null_spike=0.1, mean_tol=0.2, std_tol=0.3):
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
+class StreamingWriter:
+    """
+    Streams a run into SQLite while it executes instead of holding it all
+    in memory until `persist_current_run`. Once attached, the tracker hands
+    its buffered nodes, edges and column stats to the writer whenever
+    `max_rows` rows are pending or `max_interval_s` has passed since the
+    last flush; each flush is one transaction. `close()` (also registered
+    with atexit) writes whatever is left and folds the structure, staged
+    under a per-run id until then, into its content-addressed snapshot.
 
-    def load_stats(run):
-        cur.execute("SELECT * FROM column_stats WHERE run_id = ?", (run,))
-        cols = [c[0] for c in cur.description]
-        out = {}
-        for r in cur.fetchall():
-            d = dict(zip(cols, r))
-            out[(d["dataset_id"], d["column"])] = d
-        return out
-    A, B = load_stats(base_run), load_stats(curr_run)
+    While streaming, the tracker only holds the unflushed tail of the run,
+    so export from the DB rather than with `tracker.export_json()`.
+    """
+
+    def __init__(self, db_path: str, owner=None, max_rows: int = 5_000, max_interval_s: float = 5.0):
+        self.db_path = db_path
+        self.owner = owner or current_tracker()
+        self.max_rows = max_rows
+        self.max_interval_s = max_interval_s
+        self.rows_written = 0
+        self.staged_id = f"staging:{self.owner.run_id}"
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def start(self):
+        # any thread of the run may trigger a flush; _lock serializes use of the connection
+        self._conn = init_db(self.db_path, check_same_thread=False)
+        _write_run(self._conn.cursor(), self.owner.run_id, self.staged_id, self.owner.capture_level)
+        self._conn.commit()
+        self._last_flush = time.monotonic()
+        self.owner.writer = self
+        atexit.register(self.close)
+        return self
+
+    def maybe_flush(self):
+        if self.owner.pending_rows() >= self.max_rows or \
+                time.monotonic() - self._last_flush >= self.max_interval_s:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            rows = self.owner.drain()
+            cur = self._conn.cursor()
+            _write_structure(cur, self.staged_id, _structure_rows(rows))
+            _write_run_rows(cur, self.owner.run_id, rows)
+            self._conn.commit()
+            self.rows_written += sum(len(v) for v in rows.values())
+            self._last_flush = time.monotonic()
+        from .graph_cache import invalidate
+        invalidate(self.db_path, self.owner.run_id)
+
+    def close(self):
+        if self._conn is None:
+            return
+        atexit.unregister(self.close)
+        try:
+            self.owner.flush()
+            self.flush()
+            with self._lock:
+                cur = self._conn.cursor()
+                _finalize_snapshot(cur, self.staged_id)
+                _write_overhead(cur, self.owner.run_id, self.owner)
+                self._conn.commit()
+        finally:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+            if self.owner.writer is self:
+                self.owner.writer = None
+
+# Column-stat diff between two runs, evaluated in SQLite as a full outer join
+# on (dataset_id, column): a LEFT JOIN for matched/dropped columns and, only
+# when the row counts say there are any, an anti-join for added ones. Both
+# sides are range scans / point probes on the column_stats primary key, and
+# only flagged rows come back to Python.
+_DIFF_SQL = """
+SELECT * FROM (
+    SELECT ds, col, in_b, a_dtype, b_dtype, a_null, b_null, a_mean, b_mean, a_std, b_std,
+           in_b AND a_dtype IS NOT b_dtype AS type_change,
+           in_b AND b_null - a_null >= :null_spike + slack AS null_spike,
+           in_b AND a_mean IS NOT NULL AND b_mean IS NOT NULL AND (
+               ABS(b_mean - a_mean) / (CASE WHEN ABS(a_mean) > 1e-9 THEN ABS(a_mean) ELSE 1.0 END)
+                   >= :mean_tol + slack * (
+                       -- error of a sampled mean scales with the coefficient of variation
+                       CASE WHEN a_std IS NOT NULL AND ABS(a_mean) > 1e-9
+                                 AND ABS(a_std) / ABS(a_mean) <= 1.7976931348623157e308
+                            THEN ABS(a_std) / ABS(a_mean) ELSE 1.0 END)
+               OR (a_std IS NOT NULL AND b_std IS NOT NULL AND
+                   ABS(b_std - a_std) / (CASE WHEN ABS(a_std) > 1e-9 THEN ABS(a_std) ELSE 1.0 END)
+                       >= :std_tol + slack)) AS value_shift
+    FROM (
+        SELECT a.dataset_id AS ds, a.column AS col, b.run_id IS NOT NULL AS in_b,
+               a.dtype AS a_dtype, b.dtype AS b_dtype, a.mean AS a_mean, b.mean AS b_mean,
+               a.std AS a_std, b.std AS b_std,
+               COALESCE(a.nulls, 0) * 1.0 / COALESCE(NULLIF(a.count, 0), 1) AS a_null,
+               COALESCE(b.nulls, 0) * 1.0 / COALESCE(NULLIF(b.count, 0), 1) AS b_null,
+               -- standard-error factor of the least confident side; 0 for exact stats
+               :sample_z * MAX(1.0 - COALESCE(a.confidence, 1.0), 1.0 - COALESCE(b.confidence, 1.0)) AS slack
+        FROM column_stats a
+        LEFT JOIN column_stats b ON b.run_id = :curr AND b.dataset_id = a.dataset_id AND b.column = a.column
+        WHERE a.run_id = :base
+          -- identical stats cannot trip a positive tolerance; skip the arithmetic
+          AND (NOT :prefilter OR b.run_id IS NULL OR a.dtype IS NOT b.dtype OR a.nulls IS NOT b.nulls
+               OR a.count IS NOT b.count OR a.mean IS NOT b.mean OR a.std IS NOT b.std)
+    )
+)
+WHERE NOT in_b OR type_change OR null_spike OR value_shift
+ORDER BY ds, col
+"""
+
+_ADDED_SQL = """
+SELECT b.dataset_id, b.column FROM column_stats b
+WHERE b.run_id = :curr AND NOT EXISTS (
+    SELECT 1 FROM column_stats a WHERE a.run_id = :base AND a.dataset_id = b.dataset_id AND a.column = b.column)
+ORDER BY b.dataset_id, b.column
+"""
+
+# Schema diff of two runs' snapshots, for runs captured without stats: columns matched on id (a hash
+# of dataset id and name) both ways; `matched` is 1, 0 for dropped, NULL for added.
+_SCHEMA_DIFF_SQL = """
+SELECT * FROM (
+    SELECT a.dataset_id AS ds, a.name AS col, b.id IS NOT NULL AS matched, a.dtype AS a_dtype, b.dtype AS b_dtype
+    FROM columns a LEFT JOIN columns b ON b.snapshot_id = :curr AND b.id = a.id
+    WHERE a.snapshot_id = :base AND (b.id IS NULL OR (:types AND a.dtype IS NOT b.dtype))
+    UNION ALL
+    SELECT b.dataset_id, b.name, NULL, NULL, b.dtype FROM columns b
+    WHERE b.snapshot_id = :curr AND NOT EXISTS (SELECT 1 FROM columns a WHERE a.snapshot_id = :base AND a.id = b.id)
+)
+ORDER BY matched IS NOT NULL, ds, col
+"""
+
+def _schema_changes(conn: sqlite3.Connection, base_run: str, curr_run: str, level: CaptureLevel):
+    if level is CaptureLevel.OFF:
+        return []
+    base, curr = snapshot_for(conn, base_run), snapshot_for(conn, curr_run)
+    if base == curr:
+        return []
+    changes = []
+    for ds_id, col, matched, a_dtype, b_dtype in conn.execute(
+            _SCHEMA_DIFF_SQL, {"base": base, "curr": curr, "types": level is CaptureLevel.SCHEMA}):
+        change = {"run_id": curr_run, "node_kind": "column", "node_id": f"{ds_id}|{col}"}
+        if matched is None:
+            change.update(change_type="schema_add", severity="LOW",
+                          detail=json.dumps({"dataset_id": ds_id, "column": col}))
+        elif not matched:
+            change.update(change_type="schema_drop", severity="CRITICAL",
+                          detail=json.dumps({"dataset_id": ds_id, "column": col}))
+        else:
+            change.update(change_type="type_change", severity="HIGH", detail=json.dumps({"from": a_dtype, "to": b_dtype}))
+        changes.append(change)
+    return changes
+
+def detect_changes(db_path: str, base_run: str, curr_run: str, null_spike=0.1, mean_tol=0.2, std_tol=0.3,
+                   sample_z=3.0):
+    """
+    Tolerances are widened by `sample_z` standard errors when either side
+    was profiled from a row sample (see `ProfilePolicy`).
+
+    Only what both runs captured is compared (see `CaptureLevel`): below
+    full there are no stats, so the snapshots' columns are diffed for
+    adds/drops, plus dtype changes when both captured the schema.
+    """
+    params = {"base": base_run, "curr": curr_run, "null_spike": null_spike, "mean_tol": mean_tol,
+              "std_tol": std_tol, "sample_z": sample_z,
+              "prefilter": min(null_spike, mean_tol, std_tol) > 0 and sample_z >= 0}
+    conn = open_db(db_path)
+    try:
+        level = min((run_capture_level(conn, r) for r in (base_run, curr_run)), key=list(CaptureLevel).index)
+        if level is not CaptureLevel.FULL:
+            return _schema_changes(conn, base_run, curr_run, level)
+        rows = conn.execute(_DIFF_SQL, params).fetchall()
+        n_base, n_curr = (conn.execute("SELECT COUNT(*) FROM column_stats WHERE run_id=?", (r,)).fetchone()[0]
+                          for r in (base_run, curr_run))
+        dropped = sum(1 for r in rows if not r[2])
+        # every current key beyond the matched ones is an addition
+        added = conn.execute(_ADDED_SQL, params).fetchall() if n_curr > n_base - dropped else []
+    finally:
+        conn.close()
     changes = []
 
-    keys = set(A.keys()) | set(B.keys())
-    for key in keys:
-        a, b = A.get(key), B.get(key)
-        ds_id, col = key if b else (a["dataset_id"], a["column"])
+    for ds_id, col in added:
+        changes.append({"run_id": curr_run, "node_kind": "column", "node_id": f"{ds_id}|{col}",
+                        "change_type": "schema_add", "severity": "LOW",
+                        "detail": json.dumps({"dataset_id": ds_id, "column": col})})
+    for (ds_id, col, in_b, a_dtype, b_dtype, a_null, b_null, a_mean, b_mean, a_std, b_std,
+         type_change, null_hit, value_hit) in rows:
         col_id = f"{ds_id}|{col}"
 
-        if a and not b:
+        if not in_b:
             changes.append({"run_id": curr_run, "node_kind": "column", "node_id": col_id,
                             "change_type": "schema_drop", "severity": "CRITICAL",
                             "detail": json.dumps({"dataset_id": ds_id, "column": col})})
             continue
-        if b and not a:
-            changes.append({"run_id": curr_run, "node_kind": "column", "node_id": col_id,
-                            "change_type": "schema_add", "severity": "LOW",
-                            "detail": json.dumps({"dataset_id": ds_id, "column": col})})
-            continue
-        if a["dtype"] != b["dtype"]:
+        if type_change:
             changes.append({"run_id": curr_run, "node_kind":"column", "node_id":col_id,
                             "change_type":"type_change", "severity":"HIGH",
-                            "detail":json.dumps({"from":a["dtype"], "to":b["dtype"]})})
-
-        a_null = (a["nulls"] or 0) / (a["count"] or 1)
-        b_null = (b["nulls"] or 0) / (b["count"] or 1)
-        if b_null - a_null >= null_spike:
+                            "detail":json.dumps({"from":a_dtype, "to":b_dtype})})
+        if null_hit:
             changes.append({"run_id": curr_run, "node_kind": "column", "node_id": col_id,
                             "change_type": "null_spike", "severity": "MEDIUM",
                             "detail": json.dumps({"from": a_null, "to": b_null})})
-        if a["mean"] is not None and b["mean"] is not None:
-            # relative deltas; guard divide-by-zero
-            def rel(old, new):
-                return abs(new - old) / (abs(old) if abs(old) > 1e-9 else 1.0)
-
-            if rel(a["mean"], b["mean"]) >= mean_tol or \
-                    (a["std"] is not None and b["std"] is not None and rel(a["std"], b["std"]) >= std_tol):
-                changes.append({"run_id": curr_run, "node_kind": "column", "node_id": col_id,
-                                "change_type": "value_shift", "severity": "LOW",
-                                "detail": json.dumps({"mean_from": a["mean"], "mean_to": b["mean"],
-                                                      "std_from": a["std"], "std_to": b["std"]})})
-    conn.close()
+        if value_hit:
+            changes.append({"run_id": curr_run, "node_kind": "column", "node_id": col_id,
+                            "change_type": "value_shift", "severity": "LOW",
+                            "detail": json.dumps({"mean_from": a_mean, "mean_to": b_mean,
+                                                  "std_from": a_std, "std_to": b_std})})
     return changes
 
 def latest_run_id(conn: sqlite3.Connection):
@@ -221,36 +755,42 @@ def latest_run_id(conn: sqlite3.Connection):
     row = cur.fetchone()
     return row[0] if row else ""
 
-def export_json_from_db(db_path: str, json_path: str, run_id: str | None = None):
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    if not run_id:
-        run_id = latest_run_id(conn)
-
-    result: Dict[str, Any] = {"run_id": run_id, "nodes": {}, "edges": {}}
-
-    for table, key in [
-        ("datasets", "datasets"),
-        ("columns", "columns"),
-        ("transforms", "transforms"),
-    ]:
-        cur.execute(f"SELECT * FROM {table} WHERE run_id=?", (run_id,))
-        cols = [c[0] for c in cur.description]
-        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-        result["nodes"][key] = rows
-
-    for table, key in [
-        ("dataset_to_transform_edges", "dataset_to_transform"),
-        ("transform_to_dataset_edges", "transform_to_dataset"),
-        ("column_to_transform_edges", "column_to_transform"),
-        ("transform_to_column_edges", "transform_to_column"),
-    ]:
-        cur.execute(f"SELECT * FROM {table} WHERE run_id=?", (run_id,))
-        cols = [c[0] for c in cur.description]
-        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-        result["edges"][key] = rows
+def snapshot_for(conn: sqlite3.Connection, run_id: str) -> str:
+    row = conn.execute("SELECT snapshot_id FROM runs WHERE run_id=?", (run_id,)).fetchone()
+    return row[0] if row and row[0] else ""
 
-    conn.close()
+# A run's graph rows in the per-run layout (snapshot resolved, row counts joined in).
+RUN_QUERIES = {
+    "datasets": """
+        SELECT d.id, d.name, d.kind, d.fmt, d.path, d.code_file, d.code_line, r.rows, :run_id AS run_id
+        FROM datasets d LEFT JOIN dataset_rows r ON r.run_id = :run_id AND r.dataset_id = d.id
+        WHERE d.snapshot_id = :snapshot_id""",
+    "columns": "SELECT id, dataset_id, name, dtype, :run_id AS run_id FROM columns WHERE snapshot_id = :snapshot_id",
+    "transforms": """
+        SELECT id, name, code_file, code_line, params_hash, :run_id AS run_id
+        FROM transforms WHERE snapshot_id = :snapshot_id""",
+    "dataset_to_transform_edges": """
+        SELECT src_dataset_id, transform_id, :run_id AS run_id
+        FROM dataset_to_transform_edges WHERE snapshot_id = :snapshot_id""",
+    "transform_to_dataset_edges": """
+        SELECT transform_id, dest_dataset_id, :run_id AS run_id
+        FROM transform_to_dataset_edges WHERE snapshot_id = :snapshot_id""",
+    "column_to_transform_edges": """
+        SELECT src_col_id, transform_id, :run_id AS run_id
+        FROM column_to_transform_edges WHERE snapshot_id = :snapshot_id""",
+    "transform_to_column_edges": """
+        SELECT transform_id, dest_col_id, :run_id AS run_id
+        FROM transform_to_column_edges WHERE snapshot_id = :snapshot_id""",
+}
+
+def run_rows(conn: sqlite3.Connection, run_id: str, table: str, snapshot_id: str | None = None):
+    """(column names, rows) of `table` for a run, resolved through its snapshot."""
+    if snapshot_id is None:
+        snapshot_id = snapshot_for(conn, run_id)
+    cur = conn.execute(RUN_QUERIES[table], {"run_id": run_id, "snapshot_id": snapshot_id})
+    return [c[0] for c in cur.description], cur.fetchall()
 
-    with open(json_path, "w") as f:
-        json.dump(result, f)
\ No newline at end of file
+def export_json_from_db(db_path: str, json_path: str, run_id: str | None = None):
+    """Write a run as one JSON document, streamed page by page (see `export.export_run` for NDJSON/compression)."""
+    from .export import export_run
+    export_run(db_path, json_path, run_id, fmt="json")
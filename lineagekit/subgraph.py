@@ -0,0 +1,143 @@
+"""
+Bounded neighborhoods of one node in a run's graph, for drawing. The graph
+is walked hop by hop in SQL, one batched probe of an edge table's primary
+key or reverse index per step, so the cost depends on the neighborhood
+and not on the size of the run.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Literal, Tuple
+import sqlite3
+
+from .store import open_db, snapshot_for
+
+# SQLite's default host-parameter limit is 999 on older builds
+_IN_BATCH = 900
+
+# level -> (data-node edge into transforms, transform edge out to data nodes)
+#          as (table, data-node column)
+_EDGES = {
+    "column": (("column_to_transform_edges", "src_col_id"), ("transform_to_column_edges", "dest_col_id")),
+    "dataset": (("dataset_to_transform_edges", "src_dataset_id"), ("transform_to_dataset_edges", "dest_dataset_id")),
+}
+
+@dataclass
+class Neighborhood:
+    focus: str
+    level: str
+    nodes: Dict[str, dict] = field(default_factory=dict)   # id -> {"id", "label", "kind", "hop"}
+    edges: List[Tuple[str, str]] = field(default_factory=list)
+    truncated: bool = False  # stopped at max_nodes before reaching depth
+
+def _probe(cur: sqlite3.Cursor, table: str, key: str, other: str, snapshot_id: str,
+           ids: Iterable[str]) -> List[Tuple[str, str]]:
+    """(key value, other value) rows of `table` for the given key values; one indexed IN probe per batch."""
+    ids = list(ids)
+    out = []
+    for i in range(0, len(ids), _IN_BATCH):
+        part = ids[i:i + _IN_BATCH]
+        out += cur.execute(f"SELECT {key}, {other} FROM {table} WHERE snapshot_id = ? AND {key} IN "
+                           f"({', '.join('?' * len(part))}) ORDER BY {key}, {other}",
+                           [snapshot_id, *part]).fetchall()
+    return out
+
+def _steps(cur: sqlite3.Cursor, level: str, snapshot_id: str, frontier: List[str],
+           downstream: bool) -> List[Tuple[str, str, str]]:
+    """Edges one hop (data node -> transform -> data node) away from `frontier`, as (src, dst, transform)."""
+    (into_tr, data_in), (out_tr, data_out) = _EDGES[level]
+    if downstream:
+        first = _probe(cur, into_tr, data_in, "transform_id", snapshot_id, frontier)
+        second = _probe(cur, out_tr, "transform_id", data_out, snapshot_id, sorted({t for _, t in first}))
+        return [(n, t, t) for n, t in first] + [(t, n, t) for t, n in second]
+    first = _probe(cur, out_tr, data_out, "transform_id", snapshot_id, frontier)
+    second = _probe(cur, into_tr, "transform_id", data_in, snapshot_id, sorted({t for _, t in first}))
+    return [(t, n, t) for n, t in first] + [(n, t, t) for t, n in second]
+
+def _labels(cur: sqlite3.Cursor, level: str, snapshot_id: str, nodes: Dict[str, dict]):
+    def fetch(sql: str, ids: List[str]):
+        for i in range(0, len(ids), _IN_BATCH):
+            part = ids[i:i + _IN_BATCH]
+            yield from cur.execute(sql.format(marks=", ".join("?" * len(part))), [snapshot_id, *part])
+
+    transforms = [n for n, d in nodes.items() if d["kind"] == "transform"]
+    data = [n for n, d in nodes.items() if d["kind"] != "transform"]
+    for tid, name in fetch("SELECT id, name FROM transforms WHERE snapshot_id = ? AND id IN ({marks})", transforms):
+        nodes[tid]["label"] = f"TR: {name}"
+    if level == "column":
+        sql = """SELECT c.id, COALESCE(d.name, '?') || '.' || c.name FROM columns c
+                 LEFT JOIN datasets d ON d.snapshot_id = c.snapshot_id AND d.id = c.dataset_id
+                 WHERE c.snapshot_id = ? AND c.id IN ({marks})"""
+        for cid, label in fetch(sql, data):
+            nodes[cid]["label"] = label
+    else:
+        sql = "SELECT id, name, kind FROM datasets WHERE snapshot_id = ? AND id IN ({marks})"
+        for did, name, kind in fetch(sql, data):
+            nodes[did]["label"] = f"DS: {name} ({kind})"
+
+def neighborhood(db_path: str, run_id: str, focus: str, level: Literal["column", "dataset"] = "column",
+                 depth: int = 2, direction: Literal["both", "upstream", "downstream"] = "both",
+                 max_nodes: int = 200) -> Neighborhood:
+    """
+    Nodes within `depth` hops of `focus` (a column or dataset id, per
+    `level`); one hop goes through one transform. Growth stops once
+    `max_nodes` nodes are collected, nearest hops first.
+    """
+    if level not in _EDGES:
+        raise ValueError(f"Unknown level {level!r} (column|dataset)")
+    if direction not in ("both", "upstream", "downstream"):
+        raise ValueError(f"Unknown direction {direction!r} (both|upstream|downstream)")
+    conn = open_db(db_path)
+    try:
+        cur = conn.cursor()
+        snapshot_id = snapshot_for(conn, run_id)
+        table = "columns" if level == "column" else "datasets"
+        if cur.execute(f"SELECT 1 FROM {table} WHERE snapshot_id = ? AND id = ?", (snapshot_id, focus)).fetchone() is None:
+            raise ValueError(f"No {level} {focus!r} in run {run_id!r}")
+
+        nb = Neighborhood(focus=focus, level=level)
+        nb.nodes[focus] = {"id": focus, "label": focus, "kind": level, "hop": 0}
+        edges = set()
+        # both directions advance a hop at a time, so the cap keeps the nearest nodes on each side
+        frontiers = {d: [focus] for d in (True, False) if direction == "both" or d == (direction == "downstream")}
+        for hop in range(1, depth + 1):
+            for downstream, frontier in list(frontiers.items()):
+                frontiers[downstream] = []
+                if not frontier:
+                    continue
+                for src, dst, tid in _steps(cur, level, snapshot_id, frontier, downstream):
+                    for n in (src, dst):
+                        if n in nb.nodes:
+                            continue
+                        if len(nb.nodes) >= max_nodes:
+                            nb.truncated = True
+                            continue
+                        kind = "transform" if n == tid else level
+                        nb.nodes[n] = {"id": n, "label": n[:8], "kind": kind, "hop": hop}
+                        if kind == level:
+                            frontiers[downstream].append(n)
+                    if src in nb.nodes and dst in nb.nodes:
+                        edges.add((src, dst))
+            if nb.truncated:
+                break
+        nb.edges = sorted(edges)
+        _labels(cur, level, snapshot_id, nb.nodes)
+    finally:
+        conn.close()
+    return nb
+
+def find_nodes(db_path: str, run_id: str, text: str = "", level: Literal["column", "dataset"] = "column",
+               limit: int = 50) -> List[Tuple[str, str]]:
+    """(id, label) of columns/datasets whose label contains `text`, for picking a focus node."""
+    conn = open_db(db_path)
+    try:
+        snapshot_id = snapshot_for(conn, run_id)
+        pattern = f"%{text}%"
+        if level == "column":
+            sql = """SELECT c.id, d.name || '.' || c.name AS label FROM columns c
+                     JOIN datasets d ON d.snapshot_id = c.snapshot_id AND d.id = c.dataset_id
+                     WHERE c.snapshot_id = ? AND label LIKE ? ORDER BY label LIMIT ?"""
+        else:
+            sql = """SELECT id, name AS label FROM datasets
+                     WHERE snapshot_id = ? AND label LIKE ? ORDER BY label LIMIT ?"""
+        return conn.execute(sql, (snapshot_id, pattern, limit)).fetchall()
+    finally:
+        conn.close()
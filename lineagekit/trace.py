@@ -0,0 +1,113 @@
+"""
+Column provenance ("where did this come from / where does it go") as a
+recursive CTE inside SQLite. Each step of the walk is an index probe on
+the column<->transform edge tables of the run's snapshot, so a trace
+never loads the graph into Python.
+"""
+from collections import defaultdict
+from typing import Dict, List, Literal, Optional
+import sqlite3
+
+from .store import latest_run_id, open_db, snapshot_for
+
+# direction -> (column one hop further, transform taken, joins from the walk's current column w.col_id).
+# CROSS JOIN pins the join order: without ANALYZE stats the planner may otherwise drive the step from
+# an edge index over the whole snapshot rather than from the walk.
+_HOP = {
+    "up": ("c.src_col_id", "t.transform_id", """
+        CROSS JOIN transform_to_column_edges t ON t.snapshot_id = :snapshot_id AND t.dest_col_id = w.col_id
+        CROSS JOIN column_to_transform_edges c ON c.snapshot_id = :snapshot_id AND c.transform_id = t.transform_id"""),
+    "down": ("t.dest_col_id", "c.transform_id", """
+        CROSS JOIN column_to_transform_edges c ON c.snapshot_id = :snapshot_id AND c.src_col_id = w.col_id
+        CROSS JOIN transform_to_column_edges t ON t.snapshot_id = :snapshot_id AND t.transform_id = c.transform_id"""),
+}
+# `reach` recurses over distinct (hop, column) only, so a column reached along many paths is expanded
+# once per hop and not once per path; the steps are one more (non-recursive) hop from each of them.
+# next_col_id is the column one hop closer to the origin.
+_TRACE_SQL = """
+WITH RECURSIVE reach(hop, col_id) AS (
+    SELECT 0, :col_id
+    UNION
+    SELECT w.hop + 1, {col} FROM reach w {joins} WHERE w.hop < :depth
+),
+walk(hop, col_id, transform_id, next_col_id) AS (
+    SELECT 0, :col_id, NULL, NULL
+    UNION ALL
+    SELECT w.hop + 1, {col}, {tr}, w.col_id FROM reach w {joins} WHERE w.hop < :depth
+)
+SELECT w.hop, w.col_id, d.name, col.name, w.transform_id, tr.name, w.next_col_id
+FROM walk w
+LEFT JOIN columns col ON col.snapshot_id = :snapshot_id AND col.id = w.col_id
+LEFT JOIN datasets d ON d.snapshot_id = :snapshot_id AND d.id = col.dataset_id
+LEFT JOIN transforms tr ON tr.snapshot_id = :snapshot_id AND tr.id = w.transform_id
+ORDER BY w.hop, d.name, col.name, tr.name
+LIMIT :limit
+"""
+
+def resolve_column(conn: sqlite3.Connection, snapshot_id: str, ref: str) -> str:
+    """Column id from an id, a detect_changes node id (`<dataset_id>|<column>`) or `dataset.column`."""
+    if conn.execute("SELECT 1 FROM columns WHERE snapshot_id=? AND id=?", (snapshot_id, ref)).fetchone():
+        return ref
+    if "|" in ref:
+        ds_id, col = ref.split("|", 1)
+        row = conn.execute("SELECT id FROM columns WHERE snapshot_id=? AND dataset_id=? AND name=?",
+                           (snapshot_id, ds_id, col)).fetchone()
+        if row:
+            return row[0]
+    if "." in ref:
+        ds_name, col = ref.split(".", 1)
+        rows = conn.execute("""SELECT c.id FROM columns c JOIN datasets d ON d.snapshot_id = c.snapshot_id AND d.id = c.dataset_id
+                               WHERE c.snapshot_id=? AND d.name=? AND c.name=?""", (snapshot_id, ds_name, col)).fetchall()
+        if len(rows) == 1:
+            return rows[0][0]
+        if len(rows) > 1:
+            raise ValueError(f"{ref!r} matches {len(rows)} columns; pass a column id")
+    raise ValueError(f"No column {ref!r} in this run")
+
+def trace(db_path: str, column: str, run_id: Optional[str] = None, direction: Literal["up", "down"] = "up",
+          depth: int = 10, limit: int = 10_000) -> List[Dict]:
+    """
+    Steps of the upstream (`up`) or downstream (`down`) walk from `column`
+    (see `resolve_column`), nearest first: one dict per (hop, column,
+    transform, next column) where `next_col_id` is the column one hop
+    closer to the origin. Hop 0 is the origin itself.
+    """
+    if direction not in _HOP:
+        raise ValueError(f"Unknown direction {direction!r} (up|down)")
+    conn = open_db(db_path)
+    try:
+        run_id = run_id or latest_run_id(conn)
+        snapshot_id = snapshot_for(conn, run_id)
+        if not snapshot_id:
+            raise ValueError(f"No run {run_id!r} in {db_path}")
+        col_id = resolve_column(conn, snapshot_id, column)
+        col, tr, joins = _HOP[direction]
+        rows = conn.execute(_TRACE_SQL.format(col=col, tr=tr, joins=joins),
+                            {"col_id": col_id, "snapshot_id": snapshot_id, "depth": depth, "limit": limit}).fetchall()
+    finally:
+        conn.close()
+    return [{"hop": hop, "col_id": cid, "dataset": ds, "column": name, "transform_id": tid, "transform": tname,
+             "next_col_id": nxt}
+            for hop, cid, ds, name, tid, tname, nxt in rows]
+
+def trace_paths(steps: List[Dict], limit: int = 100) -> List[List[Dict]]:
+    """
+    Whole paths from the origin to each column with nothing further,
+    as lists of steps (origin first), at most `limit` of them.
+    """
+    if not steps:
+        return []
+    children = defaultdict(list)
+    for s in steps:
+        if s["hop"]:
+            children[(s["hop"] - 1, s["next_col_id"])].append(s)
+    paths: List[List[Dict]] = []
+    stack = [[steps[0]]]
+    while stack and len(paths) < limit:
+        path = stack.pop()
+        nxt = children.get((path[-1]["hop"], path[-1]["col_id"]))
+        if not nxt:
+            paths.append(path)
+            continue
+        stack.extend(path + [s] for s in reversed(nxt))
+    return paths
@@ -2,14 +2,17 @@ from typing import Dict, Optional, List
 import time, functools, inspect
 import pandas as pd
 
-from .ast_assist import analyze_transform_source
-from .lineage_tracker import tracker, TransformNode, DatasetNode, ColumnNode, ColToTransformEdge, TransformToColEdge, TransformToDatasetEdge, DatasetToTransformEdge, _params_hash, _get_id, _col_id, _ensure_dataset_node_from_df, _stats_for
+from .ast_assist import analyze_function
+from .overhead import charge, timed_call
+from .chunked import ChunkStream, is_chunk_iterator, replace_chunk_arg
+from .lineage_tracker import tracker, TransformNode, DatasetNode, ColToTransformEdge, TransformToColEdge, TransformToDatasetEdge, DatasetToTransformEdge, _params_hash, _get_id, _col_id, _ensure_dataset_node_from_df, _stats_for, _register_dataset, CaptureLevel, ProfilePolicy
 
 def transform(name: str,
               produces: str,
               passthrough: Optional[List[str]] = None,
               rename: Optional[Dict[str, str]] = None,
-              derives: Optional[Dict[str, List[str]]] = None):
+              derives: Optional[Dict[str, List[str]]] = None,
+              profile: Optional[ProfilePolicy] = None):
 
     passthrough = passthrough or []
     rename = rename or {}
@@ -19,58 +22,30 @@ def transform(name: str,
         source_file = inspect.getsourcefile(func) or "<unknown>"
         source_line = inspect.getsourcelines(func)[1] if inspect.getsourcelines(func) else None
         p_hash = _params_hash({"passthrough": passthrough, "rename": rename, "derives": derives})
+        cost_key = f"{func.__module__}.{func.__qualname__}"
 
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            t0 = time.time()
-
-            df_in = None
-            for a in list(args) + list(kwargs.values()):
-                if isinstance(a, pd.DataFrame):
-                    df_in = a
-                    break
-            if df_in is None:
-                raise ValueError("@transform expects a pandas DataFrame argument")
-
-            in_ds_id = _ensure_dataset_node_from_df(df_in, fallback_name=f"{name}_input")
+        def register_output(df_out: pd.DataFrame, rows: Optional[int], t0: float) -> DatasetNode:
+            out_ds_id = _get_id("ds", produces, source_file, str(source_line))
+            return _register_dataset(out_ds_id, produces, "temp", None, None, source_file, source_line,
+                                     df_out, rows, t0)
 
-            df_out = func(*args, **kwargs)
-            if not isinstance(df_out, pd.DataFrame):
-                return df_out
+        def register_input(chunk: pd.DataFrame) -> Optional[DatasetNode]:
+            # chunks of a tracked dataset are only observed; others become an anonymous input
+            if chunk.attrs.get("__ds_id__"):
+                return None
+            fallback_name = f"{name}_input"
+            return _register_dataset(_get_id("anon", fallback_name), fallback_name, "temp", None, None,
+                                     "<runtime>", 0, chunk, None, time.time())
 
-            out_ds_id = _get_id("ds", produces, source_file, str(source_line))
-            out_node = DatasetNode(id=out_ds_id,
-                                   name=produces,
-                                   kind="temp",
-                                   fmt=None,
-                                   path=None,
-                                   code_file=source_file,
-                                   code_line=source_line,
-                                   rows=len(df_out),
-                                   run_id=tracker.run_id,
-                                   created_at=t0)
-            tracker.insert_dataset(out_node)
-            out_cols = [ColumnNode(id=_get_id(out_ds_id, col),
-                                    name=str(col),
-                                    dataset_id=out_ds_id,
-                                    dtype=str(df_out[col].dtype),
-                                    run_id=tracker.run_id)
-                         for col in df_out.columns]
-            tracker.insert_columns(out_cols)
-            df_out.attrs["__ds_id__"] = out_ds_id
-            _stats_for(df_out, out_ds_id)
-
-            try:
-                src = inspect.getsource(func)
-                static_rename, static_derives = analyze_transform_source(src, df_param_names=["df"])
-            except Exception:
-                static_rename, static_derives = {}, {}
+        def record_edges(in_ds_id: str, in_columns, out_ds_id: str, out_columns, t0: float):
+            with charge("ast"):
+                static_rename, static_derives = analyze_function(func, df_param_names=["df"])
 
             eff_rename = {**static_rename, **rename}
             eff_derives = {**static_rename, **rename}
 
             if not passthrough:
-                common = set(df_in.columns) & set(df_out.columns)
+                common = set(in_columns) & set(out_columns)
                 inferred_passthrough = sorted(
                     c for c in common
                     if c not in eff_rename.keys() and c not in eff_derives.keys()
@@ -109,6 +84,53 @@ def transform(name: str,
                     in_cid = _col_id(in_ds_id, src)
                     tracker.insert_col_to_transform([ColToTransformEdge(src_col_id=in_cid, transform_id=transform_id, run_id=tracker.run_id)])
 
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if tracker.capture_level is CaptureLevel.OFF:
+                return func(*args, **kwargs)
+            with timed_call(tracker.overhead, cost_key, "transform") as call:
+                return capture(call, *args, **kwargs)
+
+        def capture(call: timed_call, *args, **kwargs):
+            t0 = time.time()
+
+            df_in = None
+            for a in list(args) + list(kwargs.values()):
+                if isinstance(a, pd.DataFrame):
+                    df_in = a
+                    break
+            stream_in = None
+            if df_in is None:
+                args, kwargs, stream_in = replace_chunk_arg(
+                    args, kwargs, lambda it: it if isinstance(it, ChunkStream) else ChunkStream(it, register_input))
+                if stream_in is None:
+                    raise ValueError("@transform expects a pandas DataFrame argument (or an iterator of DataFrames)")
+            else:
+                in_ds_id = _ensure_dataset_node_from_df(df_in, fallback_name=f"{name}_input")
+
+            def source():
+                # for chunk streams the first input chunk has been read by the time output exists
+                if stream_in is None:
+                    return in_ds_id, df_in.columns
+                if stream_in.ds_id is None:
+                    # the stream yielded no chunks: an empty anonymous input, so the edge has a source
+                    return _ensure_dataset_node_from_df(pd.DataFrame(), fallback_name=f"{name}_input"), []
+                return stream_in.ds_id, stream_in.columns
+
+            df_out = call.user(func, *args, **kwargs)
+            if is_chunk_iterator(df_out):
+                def register(chunk: pd.DataFrame) -> DatasetNode:
+                    out_node = register_output(chunk, None, t0)
+                    record_edges(*source(), out_node.id, chunk.columns, t0)
+                    return out_node
+                return ChunkStream(df_out, register, profile)
+            if not isinstance(df_out, pd.DataFrame):
+                return df_out
+
+            out_node = register_output(df_out, len(df_out), t0)
+            _stats_for(df_out, out_node.id, profile)
+            record_edges(*source(), out_node.id, df_out.columns, t0)
+
             return df_out
         return wrapper
     return decorator
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Queries behind the Streamlit app. Nothing here loads a whole run: runs are
+listed from `runs`, per-run summaries are cached in-process by run, and
+the detail tables are read a page at a time.
+"""
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import sqlite3
+
+import pandas as pd
+
+from ..store import RUN_QUERIES, open_db
+
+PAGE_ROWS = 100
+
+# run_id of datasets/columns/transforms rows comes from the run; names are joined in
+_PAGE_SQL = {
+    "datasets": RUN_QUERIES["datasets"] + " ORDER BY d.name, d.id LIMIT :limit OFFSET :offset",
+    "columns": """
+        SELECT c.id, d.name AS dataset, c.name, c.dtype, c.dataset_id
+        FROM columns c LEFT JOIN datasets d ON d.snapshot_id = c.snapshot_id AND d.id = c.dataset_id
+        WHERE c.snapshot_id = :snapshot_id ORDER BY c.id LIMIT :limit OFFSET :offset""",
+    "transforms": RUN_QUERIES["transforms"] + " ORDER BY id LIMIT :limit OFFSET :offset",
+}
+
+def list_runs(db_path: str) -> List[Tuple[str, float]]:
+    """(run_id, created_at), newest first."""
+    conn = open_db(db_path)
+    try:
+        return conn.execute("SELECT run_id, created_at FROM runs ORDER BY created_at DESC").fetchall()
+    finally:
+        conn.close()
+
+def _token(conn: sqlite3.Connection, run_id: str):
+    return conn.execute("SELECT created_at, snapshot_id FROM runs WHERE run_id=?", (run_id,)).fetchone()
+
+@lru_cache(maxsize=64)
+def _summary(db_path: str, run_id: str, token: tuple) -> Dict[str, object]:
+    snapshot_id = token[1]
+    conn = open_db(db_path)
+    try:
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE snapshot_id=?", (snapshot_id,)).fetchone()[0]
+                  for table in ("datasets", "columns", "transforms")}
+    finally:
+        conn.close()
+    return {"run_id": run_id, "snapshot_id": snapshot_id, "created_at": token[0], **counts}
+
+def run_summary(db_path: str, run_id: str) -> Dict[str, object]:
+    """Snapshot id and node counts of a run, cached until the run is re-persisted."""
+    conn = open_db(db_path)
+    try:
+        token = _token(conn, run_id)
+    finally:
+        conn.close()
+    if token is None:
+        raise ValueError(f"Unknown run {run_id!r}")
+    return _summary(db_path, run_id, tuple(token))
+
+def table_page(db_path: str, run_id: str, table: str, page: int = 0, page_rows: int = PAGE_ROWS) -> pd.DataFrame:
+    """One page (0-based) of a run's datasets/columns/transforms."""
+    snapshot_id = run_summary(db_path, run_id)["snapshot_id"]
+    conn = open_db(db_path)
+    try:
+        cur = conn.execute(_PAGE_SQL[table], {"run_id": run_id, "snapshot_id": snapshot_id,
+                                              "limit": page_rows, "offset": page * page_rows})
+        return pd.DataFrame(cur.fetchall(), columns=[c[0] for c in cur.description])
+    finally:
+        conn.close()
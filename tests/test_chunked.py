@@ -0,0 +1,38 @@
+import sqlite3
+
+import pandas as pd
+
+from lineagekit import transform
+from lineagekit.lineage_tracker import run_scope
+from lineagekit.store import persist_current_run
+
+@transform(name="collapse", produces="collapsed")
+def collapse(chunks):
+    frames = list(chunks)
+    return pd.concat(frames) if frames else pd.DataFrame({"x": []})
+
+def test_empty_chunk_iterator_persists(tmp_path):
+    db = str(tmp_path / "lineage.db")
+    with run_scope() as t:
+        out = collapse(x for x in [])
+        assert out.empty
+        persist_current_run(db)
+        edges = t.rows()["dataset_to_transform"]
+    assert len(edges) == 1 and edges[0].src_ds_id is not None
+    conn = sqlite3.connect(db)
+    names = {r[0] for r in conn.execute("SELECT name FROM datasets")}
+    conn.close()
+    assert {"collapse_input", "collapsed"} <= names
+
+def test_only_generators_and_chunk_readers_are_chunk_streams(tmp_path):
+    import csv
+    from lineagekit.chunked import is_chunk_iterator
+    path = tmp_path / "rows.csv"
+    path.write_text("a,b\n1,2\n3,4\n")
+    frames = [pd.DataFrame({"a": [1]})]
+    assert is_chunk_iterator(f for f in frames)
+    assert is_chunk_iterator(pd.read_csv(path, chunksize=1))
+    with open(path) as f:
+        for other in (map(len, frames), zip(frames), iter(frames), iter([{"a": 1}]), csv.reader(f), f):
+            assert not is_chunk_iterator(other)
+    assert not is_chunk_iterator(frames[0])
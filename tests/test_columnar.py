@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+from lineagekit.columnar import export_parquet, import_parquet
+from lineagekit.store import init_db, _write_run
+
+pytest.importorskip("pyarrow")
+
+def test_parquet_round_trip_keeps_call_overhead(tmp_path):
+    src, dst = str(tmp_path / "src.db"), str(tmp_path / "dst.db")
+    conn = init_db(src)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO snapshots(snapshot_id, created_at) VALUES ('s1', 0)")
+    _write_run(cur, "r1", "s1")
+    cur.execute("""INSERT INTO call_overhead(run_id, func, kind, calls, user_s, stats_s, ast_s, graph_s)
+                   VALUES ('r1', 'pipe.clean', 'transform', 3, 0.5, 0.1, 0.01, 0.02)""")
+    conn.commit()
+    conn.close()
+
+    assert export_parquet(src, str(tmp_path / "out")) == ["r1"]
+    assert import_parquet(dst, str(tmp_path / "out")) == ["r1"]
+    rows = sqlite3.connect(dst).execute("SELECT run_id, func, kind, calls, user_s FROM call_overhead").fetchall()
+    assert rows == [("r1", "pipe.clean", "transform", 3, 0.5)]
+
+def test_reexport_drops_partitions_a_run_no_longer_has(tmp_path):
+    src, dst, out = str(tmp_path / "src.db"), str(tmp_path / "dst.db"), str(tmp_path / "out")
+    conn = init_db(src)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO snapshots(snapshot_id, created_at) VALUES ('s1', 0)")
+    _write_run(cur, "r1", "s1")
+    cur.execute("""INSERT INTO changes(run_id, node_kind, node_id, change_type, detail, severity)
+                   VALUES ('r1', 'column', 'ds|x', 'type_change', '{}', 'HIGH')""")
+    conn.commit()
+    export_parquet(src, out)
+
+    cur.execute("DELETE FROM changes")
+    conn.commit()
+    conn.close()
+    export_parquet(src, out)
+    import_parquet(dst, out)
+    assert sqlite3.connect(dst).execute("SELECT COUNT(*) FROM changes").fetchone()[0] == 0
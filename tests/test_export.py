@@ -0,0 +1,34 @@
+import json
+import sqlite3
+
+from lineagekit.export import export_run, import_ndjson
+from lineagekit.store import init_db, _write_run
+
+def _db_with_overhead(path):
+    conn = init_db(path)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO snapshots(snapshot_id, created_at) VALUES ('s1', 0)")
+    _write_run(cur, "r1", "s1")
+    cur.executemany("""INSERT INTO call_overhead(run_id, func, kind, calls, user_s, stats_s, ast_s, graph_s)
+                       VALUES ('r1', ?, ?, ?, ?, ?, ?, ?)""",
+                    [("pipe.load", "dataset", 1, 0.2, 0.05, 0.0, 0.001),
+                     ("pipe.clean", "transform", 3, 0.5, 0.1, 0.01, 0.02),
+                     ("sklearn:onehot", "sklearn", 1, 0.03, 0.0, 0.0, 0.0004)])
+    conn.commit()
+    conn.close()
+
+def test_ndjson_round_trip_keeps_call_overhead(tmp_path):
+    src, dst, out = str(tmp_path / "src.db"), str(tmp_path / "dst.db"), str(tmp_path / "run.ndjson.gz")
+    _db_with_overhead(src)
+    export_run(src, out, "r1", fmt="ndjson")
+    assert import_ndjson(dst, out) == "r1"
+    query = "SELECT run_id, func, kind, calls, user_s, stats_s, ast_s, graph_s FROM call_overhead ORDER BY func"
+    assert sqlite3.connect(dst).execute(query).fetchall() == sqlite3.connect(src).execute(query).fetchall()
+
+def test_json_document_has_no_overhead_section(tmp_path):
+    src, out = str(tmp_path / "src.db"), str(tmp_path / "run.json")
+    _db_with_overhead(src)
+    export_run(src, out, "r1")
+    with open(out) as f:
+        doc = json.load(f)
+    assert list(doc) == ["run_id", "nodes", "edges"]
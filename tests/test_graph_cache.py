@@ -0,0 +1,23 @@
+from lineagekit.graph_cache import GraphCache
+from lineagekit.lineage_tracker import ColumnStats
+from lineagekit.store import init_db, _write_run, _write_run_rows
+
+def _stats(mean):
+    return {"datasets": [], "column_stats": [ColumnStats("ds", "x", "float64", 10, 0, mean, 1.0, None, None, "r1")]}
+
+def test_same_second_rewrite_from_another_connection_invalidates(tmp_path):
+    db = str(tmp_path / "lineage.db")
+    conn = init_db(db)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO snapshots(snapshot_id, created_at) VALUES ('s1', 0)")
+    _write_run(cur, "r1", "s1")
+    _write_run_rows(cur, "r1", _stats(1.0))
+    conn.commit()
+
+    cache = GraphCache()
+    assert cache.get(db, "r1").stats[("ds", "x")]["mean"] == 1.0
+    # same created_at second, same structure, same number of stats: only the counter moves
+    _write_run_rows(cur, "r1", _stats(2.0))
+    conn.commit()
+    conn.close()
+    assert cache.get(db, "r1").stats[("ds", "x")]["mean"] == 2.0
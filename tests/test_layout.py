@@ -0,0 +1,24 @@
+import os
+import sqlite3
+
+from lineagekit.layout import cached_layout
+from lineagekit.store import init_db
+
+EDGES = [("a", "b"), ("b", "c")]
+
+def test_layout_cache_never_creates_or_writes_schema(tmp_path):
+    missing = str(tmp_path / "missing.db")
+    assert set(cached_layout(missing, ["a", "b", "c"], EDGES, "column")) == {"a", "b", "c"}
+    assert not os.path.exists(missing)
+
+    empty = str(tmp_path / "empty.db")
+    sqlite3.connect(empty).close()
+    cached_layout(empty, ["a", "b", "c"], EDGES, "column")
+    assert sqlite3.connect(empty).execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0
+
+def test_layout_is_cached_in_a_current_db(tmp_path):
+    db = str(tmp_path / "lineage.db")
+    init_db(db).close()
+    first = cached_layout(db, ["a", "b", "c"], EDGES, "column")
+    assert sqlite3.connect(db).execute("SELECT COUNT(*) FROM layouts").fetchone()[0] == 1
+    assert cached_layout(db, ["c", "b", "a"], EDGES, "column") == first
@@ -0,0 +1,37 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from lineagekit import transform
+from lineagekit.lineage_tracker import run_scope
+from lineagekit.shards import init_worker, merge_shards
+
+@transform(name="double", produces="doubled")
+def double(df):
+    return df.assign(x=df["x"] * 2)
+
+def _work(n):
+    time.sleep(0.2)  # still running when merge_shards starts reading
+    return len(double(pd.DataFrame({"x": range(n)})))
+
+def test_queue_merge_waits_for_exit_spills():
+    ctx = mp.get_context("fork")
+    q = ctx.Queue()
+    with run_scope() as t:
+        ex = ProcessPoolExecutor(max_workers=2, mp_context=ctx, initializer=init_worker, initargs=(q, t.run_id))
+        assert list(ex.map(_work, [10, 20])) == [10, 20]
+        threading.Timer(0.3, ex.shutdown).start()
+        assert merge_shards(q, into=t, timeout=30) >= 1
+        assert {d.name for d in t.datasets.values()} == {"double_input", "doubled"}
+        assert sum(d.rows for d in t.datasets.values() if d.name == "doubled") == 30
+
+def test_queue_merge_times_out_on_a_worker_that_never_finishes():
+    q = queue.Queue()
+    q.put({"pid": 1, "worker": "started"})
+    with run_scope() as t, pytest.raises(TimeoutError, match="pids \\[1\\]"):
+        merge_shards(q, into=t, timeout=0.2)
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from lineagekit.lineage_tracker import (run_scope, ColumnNode, ColToTransformEdge, TransformToColEdge,
+                                        DatasetToTransformEdge, TransformToDatasetEdge)
+
+def test_public_attributes_read_as_views_after_threaded_appends():
+    with run_scope() as t:
+        def work(i):
+            rid = t.run_id
+            t.insert_columns([ColumnNode(f"c{i}", f"col{i}", f"ds{i}", "int64", rid)])
+            t.insert_col_to_transform([ColToTransformEdge(f"c{i}", f"tr{i}", rid)])
+            t.insert_transform_to_col([TransformToColEdge(f"tr{i}", f"c{i}", rid)])
+            t.insert_dataset_to_transform([DatasetToTransformEdge(f"ds{i}", f"tr{i}", rid)])
+            t.insert_transform_to_dataset([TransformToDatasetEdge(f"tr{i}", f"ds{i}", rid)])
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+
+        expected = {"columns": ColumnNode, "col_to_transform": ColToTransformEdge,
+                    "transform_to_col": TransformToColEdge, "dataset_to_transform": DatasetToTransformEdge,
+                    "transform_to_dataset": TransformToDatasetEdge}
+        for attr, cls in expected.items():
+            view = getattr(t, attr)
+            items = list(view)
+            assert len(view) == len(items) == 8
+            assert all(isinstance(x, cls) for x in items)
+            assert view[0] == items[0] and view[-1] == items[-1]
+        assert sorted(c.id for c in t.columns) == [f"c{i}" for i in range(8)]
+
+def test_bad_capture_env_fails_on_use_not_import(monkeypatch):
+    from lineagekit.lineage_tracker import LineageTracker, CAPTURE_ENV
+    monkeypatch.setenv(CAPTURE_ENV, "ful")
+    t = LineageTracker()  # what `import lineagekit` does for the default tracker
+    with pytest.raises(ValueError, match=CAPTURE_ENV):
+        t.capture_level
+    t.capture_level = "schema"
+    assert t.capture_level.value == "schema"
+
+def test_drain_starts_a_new_string_pool():
+    with run_scope() as t:
+        rid = t.run_id
+        t.insert_columns([ColumnNode("c0", "a", "ds0", "int64", rid)])
+        drained = t.drain()
+        t.insert_columns([ColumnNode("c1", "b", "ds1", "float64", rid)])
+        assert "c0" not in t._strings.codes
+        assert [c.id for c in drained["columns"]] == ["c0"]
+        assert [c.id for c in t.columns] == ["c1"]